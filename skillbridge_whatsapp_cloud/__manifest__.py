@@ -44,6 +44,9 @@ Setup:
         "views/whatsapp_log_views.xml",
         "views/whatsapp_log_views_pivot.xml",
         "views/whatsapp_campaign_views.xml",
+        "views/whatsapp_webhook_event_views.xml",
+        "views/whatsapp_outbox_views.xml",
+        "views/whatsapp_message_archive_views.xml",
         "views/res_partner_views.xml",
         "views/res_config_settings_view.xml",
         "data/cron.xml",
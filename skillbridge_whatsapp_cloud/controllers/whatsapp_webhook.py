@@ -2,12 +2,15 @@ import hashlib
 import hmac
 import json
 import logging
+from collections import defaultdict
 
 from odoo import _, fields, http
 from odoo.exceptions import AccessDenied
 from odoo.http import request
 from odoo.tools import html_escape
 
+from ..models.whatsapp_message_log import status_rank
+
 _logger = logging.getLogger(__name__)
 
 
@@ -60,6 +63,16 @@ class WhatsAppWebhookController(http.Controller):
             _logger.warning("Invalid WhatsApp webhook signature.")
             raise AccessDenied()
 
+        if self._is_async_ingest_enabled():
+            # Ingest mode: stage the raw body and acknowledge right away; a cron drains the queue.
+            try:
+                body_text = body_bytes.decode("utf-8")
+            except UnicodeDecodeError:
+                _logger.warning("WhatsApp webhook received a non UTF-8 payload.")
+                return http.Response(_("Invalid payload"), status=400, mimetype="text/plain")
+            request.env["whatsapp.webhook.event"].sudo()._enqueue(body_text)
+            return http.Response(status=200)
+
         # Parse JSON payload safely
         try:
             payload = json.loads(body_bytes.decode("utf-8"))
@@ -71,10 +84,22 @@ class WhatsAppWebhookController(http.Controller):
         summary = payload.get("entry", [{}])[0].get("id")
         _logger.info("WhatsApp webhook received for entry id: %s", summary)
 
-        self._process_messages(payload)
-        self._process_status_updates(payload)
+        self._process_payload(payload)
         return http.Response(status=200)
 
+    @staticmethod
+    def _is_async_ingest_enabled():
+        return (
+            request.env["ir.config_parameter"].sudo().get_param("skillbridge_whatsapp_cloud.webhook_async_ingest")
+            == "True"
+        )
+
+    def _process_payload(self, payload, env=None):
+        """Apply a parsed webhook payload; ``env`` lets the staging cron run without an HTTP request."""
+        env = env or request.env
+        self._process_messages(payload, env=env)
+        self._process_status_updates(payload, env=env)
+
     @staticmethod
     def _is_valid_signature(app_secret, header_signature, body):
         if not header_signature or not header_signature.startswith("sha256="):
@@ -86,16 +111,19 @@ class WhatsAppWebhookController(http.Controller):
         expected = hmac.new(app_secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
         return hmac.compare_digest(expected, received_sig)
 
-    def _process_messages(self, payload):
+    def _process_messages(self, payload, env=None):
         """Persist inbound messages to chatter/log for traceability."""
+        messages = []
         entries = payload.get("entry") or []
         for entry in entries:
             for change in entry.get("changes", []):
                 value = change.get("value") or {}
-                for message in value.get("messages") or []:
-                    self._handle_inbound_message(message)
+                messages.extend(value.get("messages") or [])
+        for message in self._drop_seen(messages, "message", env=env):
+            self._handle_inbound_message(message, env=env)
 
-    def _handle_inbound_message(self, message):
+    def _handle_inbound_message(self, message, env=None):
+        env = env or request.env
         msg_id = message.get("id")
         sender = (message.get("from") or "").strip()
         msg_type = message.get("type")
@@ -105,18 +133,12 @@ class WhatsAppWebhookController(http.Controller):
         elif msg_type == "button":
             text_body = (message.get("button") or {}).get("text") or ""
 
-        # Find partner by mobile/phone with or without leading +
-        Partner = request.env["res.partner"].sudo()
-        search_numbers = [sender]
-        if sender and not sender.startswith("+"):
-            search_numbers.append("+" + sender)
-        partner = Partner.search(
-            ["|", ("mobile", "in", search_numbers), ("phone", "in", search_numbers)], limit=1
-        )
+        # Find partner by normalized mobile/phone
+        partner = env["res.partner"].sudo()._find_by_whatsapp_number(sender)
 
         order = False
         if partner:
-            order = request.env["sale.order"].sudo().search(
+            order = env["sale.order"].sudo().search(
                 [("partner_id", "=", partner.id)], order="id desc", limit=1
             )
 
@@ -131,7 +153,7 @@ class WhatsAppWebhookController(http.Controller):
             "message_type": msg_type or "",
             "last_payload": json.dumps(message),
         }
-        request.env["whatsapp.message.log"].sudo().create(log_vals)
+        env["whatsapp.message.log"].sudo().create(log_vals)
 
         # Post to chatter on order if available, otherwise on partner
         body_parts = []
@@ -145,43 +167,112 @@ class WhatsAppWebhookController(http.Controller):
                 order.message_post(body=body_html, message_type="comment")
             elif partner:
                 partner.message_post(body=body_html, message_type="comment")
-        self._trigger_keyword_actions(partner or order and order.partner_id, text_body)
+        self._trigger_keyword_actions(partner or order and order.partner_id, text_body, env=env)
 
-    def _process_status_updates(self, payload):
+    def _process_status_updates(self, payload, env=None):
         """Update message logs and chatter for failed/undelivered statuses."""
+        statuses = []
         entries = payload.get("entry") or []
         for entry in entries:
             for change in entry.get("changes", []):
                 value = change.get("value") or {}
-                for status in value.get("statuses") or []:
-                    msg_id = status.get("id")
-                    status_text = status.get("status")
-                    errors = status.get("errors") or []
-                    self._update_log_and_chatter(msg_id, status_text, errors, status)
+                statuses.extend(status for status in value.get("statuses") or [] if status.get("id"))
+        statuses = self._drop_seen(statuses, "status", env=env)
+        if statuses:
+            self._apply_status_updates(statuses, env=env)
 
-    def _update_log_and_chatter(self, message_id, status_text, errors, raw_status):
+    @staticmethod
+    def _drop_seen(items, kind, env=None):
+        """Filter out messages/statuses already applied (Meta delivers webhooks at least once)."""
+        env = env or request.env
+
+        def event_key(item):
+            return item["id"], kind, (item.get("status") or "") if kind == "status" else ""
+
+        keys = [event_key(item) for item in items if item.get("id")]
+        if not keys:
+            return items
+        fresh = env["whatsapp.webhook.seen"].sudo()._claim(keys)
+        kept = []
+        for item in items:
+            if not item.get("id"):
+                kept.append(item)
+                continue
+            key = event_key(item)
+            if key in fresh:
+                # Drop repeats inside the same payload as well.
+                fresh.discard(key)
+                kept.append(item)
+        return kept
+
+    def _update_log_and_chatter(self, message_id, status_text, errors, raw_status, env=None):
         if not message_id:
             return
-        log_record = request.env["whatsapp.message.log"].sudo().search(
-            [("message_id", "=", message_id)], limit=1
+        status = dict(raw_status or {}, id=message_id, status=status_text, errors=errors)
+        self._apply_status_updates([status], env=env)
+
+    def _apply_status_updates(self, statuses, env=None):
+        """Apply every status of a payload with a constant number of queries.
+
+        All wamids are resolved with a single search and every callback is appended to
+        ``whatsapp.message.event`` with one multi-row INSERT. A log's own status is only
+        written when the events move it forward, grouped by target status/error code.
+        """
+        env = env or request.env
+        Log = env["whatsapp.message.log"].sudo()
+
+        # Keep the most advanced status per wamid; callbacks may arrive out of order.
+        latest = {}
+        for status in statuses:
+            current = latest.get(status["id"])
+            if not current or status_rank(status.get("status")) >= status_rank(current.get("status")):
+                latest[status["id"]] = status
+
+        logs_by_wamid = {}
+        for log in Log.search([("message_id", "in", list(latest))]):
+            logs_by_wamid.setdefault(log.message_id, log)
+
+        # The history keeps every callback, including late ones the log status ignores.
+        env["whatsapp.message.event"].sudo()._record(
+            [
+                env["whatsapp.message.event"]._event_values(logs_by_wamid[status["id"]].id, status)
+                for status in statuses
+                if status["id"] in logs_by_wamid
+            ]
         )
-        if not log_record:
-            _logger.info("Received WhatsApp status for unknown message id: %s", message_id)
-            return
-
-        error_code = None
-        if errors and isinstance(errors, list):
-            error_code = errors[0].get("code")
-
-        log_record.write(
-            {
-                "status": status_text or log_record.status,
-                "error_code": error_code or log_record.error_code,
-                "last_payload": json.dumps(raw_status),
-            }
-        )
-        self._update_campaign_queue(log_record, message_id, status_text, errors)
 
+        write_groups = defaultdict(list)
+        applied = []
+        for message_id, status in latest.items():
+            log_record = logs_by_wamid.get(message_id)
+            if not log_record:
+                _logger.info("Received WhatsApp status for unknown message id: %s", message_id)
+                continue
+            status_text = status.get("status")
+            if not log_record._accepts_status(status_text):
+                # Late or repeated callback: skip the write and its conversation/queue side effects.
+                continue
+            errors = status.get("errors") or []
+            error_code = None
+            if errors and isinstance(errors, list):
+                error_code = errors[0].get("code")
+            write_groups[(status_text or None, str(error_code) if error_code else None)].append(log_record.id)
+            applied.append((log_record, message_id, status_text, errors))
+
+        for (status_text, error_code), log_ids in write_groups.items():
+            vals = {}
+            if status_text:
+                vals["status"] = status_text
+            if error_code:
+                vals["error_code"] = error_code
+            if vals:
+                Log.browse(log_ids).write(vals)
+
+        self._update_campaign_queues(applied, env=env)
+        for log_record, message_id, status_text, errors in applied:
+            self._post_delivery_issue(log_record, message_id, status_text, errors)
+
+    def _post_delivery_issue(self, log_record, message_id, status_text, errors):
         order = log_record.order_id
         if status_text in ("delivered", "read"):
             return
@@ -207,41 +298,65 @@ class WhatsAppWebhookController(http.Controller):
                 errors,
             )
 
-    def _update_campaign_queue(self, log_record, message_id, status_text, errors):
+    def _update_campaign_queues(self, applied, env=None):
         """Mirror webhook delivery feedback onto campaign queue lines to avoid drip progression on failures."""
-        if not log_record.campaign_id:
+        campaign_updates = [item for item in applied if item[0].campaign_id]
+        if not campaign_updates:
             return
-        Queue = request.env["whatsapp.campaign.queue"].sudo()
-        queue_line = Queue.search(
-            [("campaign_id", "=", log_record.campaign_id.id), ("message_id", "=", message_id)],
-            limit=1,
-        )
-        if not queue_line and log_record.partner_id:
-            queue_line = Queue.search(
-                [("campaign_id", "=", log_record.campaign_id.id), ("partner_id", "=", log_record.partner_id.id)],
-                limit=1,
+        env = env or request.env
+        Queue = env["whatsapp.campaign.queue"].sudo()
+        campaign_ids = list({item[0].campaign_id.id for item in campaign_updates})
+        lines_by_wamid = {}
+        for line in Queue.search(
+            [("campaign_id", "in", campaign_ids), ("message_id", "in", [item[1] for item in campaign_updates])]
+        ):
+            lines_by_wamid.setdefault((line.campaign_id.id, line.message_id), line)
+        lines_by_partner = {}
+        partner_ids = [
+            item[0].partner_id.id
+            for item in campaign_updates
+            if item[0].partner_id and (item[0].campaign_id.id, item[1]) not in lines_by_wamid
+        ]
+        if partner_ids:
+            for line in Queue.search([("campaign_id", "in", campaign_ids), ("partner_id", "in", partner_ids)]):
+                lines_by_partner.setdefault((line.campaign_id.id, line.partner_id.id), line)
+
+        failed_groups = defaultdict(list)
+        sent_ids = []
+        for log_record, message_id, status_text, errors in campaign_updates:
+            campaign_id = log_record.campaign_id.id
+            queue_line = lines_by_wamid.get((campaign_id, message_id)) or lines_by_partner.get(
+                (campaign_id, log_record.partner_id.id)
             )
-        if not queue_line:
-            return
+            if not queue_line:
+                continue
+            if status_text in ("failed", "undelivered") or errors:
+                failed_groups[self._format_queue_error(status_text, errors)].append(queue_line.id)
+            elif status_text in ("delivered", "read"):
+                # Keep status as sent but ensure it isn't marked pending in edge cases.
+                sent_ids.append(queue_line.id)
+
+        for err_msg, line_ids in failed_groups.items():
+            Queue.browse(line_ids).write({"status": "failed", "last_error": err_msg})
+        if sent_ids:
+            Queue.browse(sent_ids).write({"status": "sent"})
 
-        if status_text in ("failed", "undelivered") or errors:
-            err_parts = []
-            for err in errors or []:
-                if isinstance(err, dict):
-                    title = err.get("title") or err.get("message") or ""
-                    code = err.get("code")
-                    err_parts.append(f"[{code}] {title}" if code else title)
-                else:
-                    err_parts.append(str(err))
-            err_msg = "; ".join([p for p in err_parts if p]) or (status_text or "")
-            queue_line.write({"status": "failed", "last_error": err_msg})
-        elif status_text in ("delivered", "read"):
-            # Keep status as sent but ensure it isn't marked pending in edge cases.
-            queue_line.write({"status": "sent"})
-
-    def _trigger_keyword_actions(self, partner, text_body):
+    @staticmethod
+    def _format_queue_error(status_text, errors):
+        err_parts = []
+        for err in errors or []:
+            if isinstance(err, dict):
+                title = err.get("title") or err.get("message") or ""
+                code = err.get("code")
+                err_parts.append(f"[{code}] {title}" if code else title)
+            else:
+                err_parts.append(str(err))
+        return "; ".join([p for p in err_parts if p]) or (status_text or "")
+
+    def _trigger_keyword_actions(self, partner, text_body, env=None):
         if not partner or not text_body:
             return
+        env = env or request.env
         keyword = text_body.strip().upper()
         opt_out_keywords = {"STOP", "UNSUBSCRIBE", "CANCEL", "END", "QUIT"}
         opt_in_keywords = {"START", "YES", "SUBSCRIBE"}
@@ -274,7 +389,7 @@ class WhatsAppWebhookController(http.Controller):
             "CALL": _("Customer requested a call back."),
         }
         if keyword in mapping:
-            user_id = partner.user_id.id if partner and partner.user_id else request.env.user.id
+            user_id = partner.user_id.id if partner and partner.user_id else env.user.id
             partner.activity_schedule(
                 "mail.mail_activity_data_todo",
                 user_id=user_id,
@@ -32,14 +32,12 @@ def post_init_hook(*args, **kwargs):
         return
 
     try:
-        logs = env["whatsapp.message.log"].sudo().search([("partner_id", "!=", False)])
-        partner_ids = logs.mapped("partner_id").ids
-        for partner_id in partner_ids:
-            last_log = env["whatsapp.message.log"].sudo().search(
-                [("partner_id", "=", partner_id)], order="create_date desc", limit=1
-            )
-            if last_log:
-                last_log._update_conversations()
+        # Fill the normalized phone keys right away so lookups and campaigns use them from the start.
+        env["res.partner"].sudo()._cron_backfill_whatsapp_e164()
+        cron = env.ref("skillbridge_whatsapp_cloud.ir_cron_whatsapp_partner_e164_backfill", raise_if_not_found=False)
+        if cron:
+            cron.active = False
+        env["whatsapp.conversation"].sudo()._backfill_from_logs()
     finally:
         if created_cursor and "cr" in locals():
             try:
@@ -2,12 +2,20 @@ from . import res_config_settings as res_config_settings
 from . import whatsapp_api as whatsapp_api
 from . import whatsapp_wizard as whatsapp_wizard
 from . import whatsapp_message_log as whatsapp_message_log
+from . import whatsapp_message_event as whatsapp_message_event
 from . import whatsapp_template as whatsapp_template
 from . import whatsapp_campaign as whatsapp_campaign
 from . import whatsapp_campaign_queue as whatsapp_campaign_queue
 from . import whatsapp_campaign_step as whatsapp_campaign_step
 from . import whatsapp_conversation as whatsapp_conversation
+from . import whatsapp_conversation_summary as whatsapp_conversation_summary
 from . import whatsapp_inbox_reply as whatsapp_inbox_reply
 from . import whatsapp_account as whatsapp_account
 from . import res_partner as res_partner
 from . import account_move as account_move
+from . import whatsapp_webhook_event as whatsapp_webhook_event
+from . import whatsapp_webhook_seen as whatsapp_webhook_seen
+from . import whatsapp_outbox as whatsapp_outbox
+from . import whatsapp_media_cache as whatsapp_media_cache
+from . import whatsapp_pdf_cache as whatsapp_pdf_cache
+from . import whatsapp_message_archive as whatsapp_message_archive
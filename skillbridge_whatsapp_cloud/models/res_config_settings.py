@@ -45,6 +45,40 @@ class ResConfigSettings(models.TransientModel):
         config_parameter="skillbridge_whatsapp_cloud.default_media_url",
         help="Fallback image URL for media sends or QR codes.",
     )
+    whatsapp_webhook_async_ingest = fields.Boolean(
+        string="Asynchronous Webhook Ingest",
+        config_parameter="skillbridge_whatsapp_cloud.webhook_async_ingest",
+        help="Store webhook callbacks after signature validation and acknowledge Meta immediately; "
+        "a cron processes the queued events in order.",
+    )
+    whatsapp_campaign_continuous_dispatch = fields.Boolean(
+        string="Continuous Campaign Dispatch",
+        config_parameter="skillbridge_whatsapp_cloud.campaign_continuous_dispatch",
+        help="Send due campaign messages back to back and wake up exactly when the next one is due, "
+        "instead of waiting for the 10-minute campaign cron.",
+    )
+    whatsapp_conversation_summary_mode = fields.Selection(
+        [("stored", "Stored on conversations"), ("view", "Computed from message logs")],
+        string="Inbox Summary",
+        default="stored",
+        config_parameter="skillbridge_whatsapp_cloud.conversation_summary_mode",
+        help="Computed mode reads each conversation's latest message from an indexed summary table that a "
+        "cron updates every minute for the conversations with new messages or statuses, so logging and "
+        "status updates no longer write (and lock) the conversation row.",
+    )
+    whatsapp_payload_retention_days = fields.Integer(
+        string="Keep Webhook Payloads (days)",
+        default=0,
+        config_parameter="skillbridge_whatsapp_cloud.payload_retention_days",
+        help="Raw webhook JSON stored on message logs is cleared after this many days. 0 keeps it forever.",
+    )
+    whatsapp_log_archive_months = fields.Integer(
+        string="Archive Message Logs After (months)",
+        default=0,
+        config_parameter="skillbridge_whatsapp_cloud.log_archive_months",
+        help="Older message logs are moved into compressed JSON Lines archive files and removed from the log "
+        "table. 0 disables archiving.",
+    )
 
     def _check_settings(self):
         for rec in self:
@@ -63,4 +97,9 @@ class ResConfigSettings(models.TransientModel):
 
     def set_values(self):
         self._check_settings()
-        return super().set_values()
+        previous_mode = self.env["ir.config_parameter"].sudo().get_param(
+            "skillbridge_whatsapp_cloud.conversation_summary_mode", "stored"
+        )
+        res = super().set_values()
+        self.env["whatsapp.conversation"]._summary_mode_changed(previous_mode)
+        return res
@@ -1,4 +1,25 @@
-from odoo import fields, models
+import logging
+import re
+import threading
+from time import monotonic
+
+from odoo import api, fields, models
+from odoo.tools import sql
+
+_logger = logging.getLogger(__name__)
+
+BACKFILL_PARAM = "skillbridge_whatsapp_cloud.partner_e164_backfill_id"
+# set_param clears the registry caches of every worker: save backfill progress at most this often (seconds).
+BACKFILL_SAVE_INTERVAL = 60
+
+
+def normalize_whatsapp_number(number):
+    """Return ``number`` as ``+<digits>`` (spaces, dashes and a ``00`` prefix removed) or False."""
+    number = (number or "").strip()
+    if number.startswith("00"):
+        number = number[2:]
+    digits = re.sub(r"\D", "", number)
+    return f"+{digits}" if digits else False
 
 
 class ResPartner(models.Model):
@@ -7,3 +28,92 @@ class ResPartner(models.Model):
     whatsapp_opt_in = fields.Boolean(string="WhatsApp Opt-In")
     whatsapp_opt_in_date = fields.Datetime(string="Opt-In Date")
     whatsapp_opt_in_source = fields.Char(string="Opt-In Source")
+    whatsapp_mobile_e164 = fields.Char(
+        string="Normalized Mobile", compute="_compute_whatsapp_e164", store=True, index=True, readonly=True
+    )
+    whatsapp_phone_e164 = fields.Char(
+        string="Normalized Phone", compute="_compute_whatsapp_e164", store=True, index=True, readonly=True
+    )
+
+    def _auto_init(self):
+        # Create the columns before the ORM does so installing on a large database does not
+        # compute them for every partner in one go; _cron_backfill_whatsapp_e164 fills them in chunks.
+        for column in ("whatsapp_mobile_e164", "whatsapp_phone_e164"):
+            if not sql.column_exists(self.env.cr, self._table, column):
+                sql.create_column(self.env.cr, self._table, column, "varchar")
+        return super()._auto_init()
+
+    @api.depends("mobile", "phone")
+    def _compute_whatsapp_e164(self):
+        for partner in self:
+            partner.whatsapp_mobile_e164 = normalize_whatsapp_number(partner.mobile)
+            partner.whatsapp_phone_e164 = normalize_whatsapp_number(partner.phone)
+
+    def _get_whatsapp_number(self, include_phone=False):
+        """Return the normalized mobile (or phone) of the partner, also before the backfill reached it."""
+        self.ensure_one()
+        number = self.whatsapp_mobile_e164 or normalize_whatsapp_number(self.mobile)
+        if not number and include_phone:
+            number = self.whatsapp_phone_e164 or normalize_whatsapp_number(self.phone)
+        return number or False
+
+    @api.model
+    def _is_whatsapp_e164_backfilled(self):
+        return self.env["ir.config_parameter"].sudo().get_param(BACKFILL_PARAM) == "-1"
+
+    @api.model
+    def _find_by_whatsapp_number(self, number):
+        """Resolve a sender number to a partner with one probe of the normalized phone indexes."""
+        key = normalize_whatsapp_number(number)
+        if not key:
+            return self.browse()
+        partner = self.search(
+            ["|", ("whatsapp_mobile_e164", "=", key), ("whatsapp_phone_e164", "=", key)], limit=1
+        )
+        if not partner and not self._is_whatsapp_e164_backfilled():
+            # Partners the backfill has not reached yet have no key: match the raw numbers as before.
+            numbers = list({number.strip(), key, key[1:]})
+            partner = self.search(["|", ("mobile", "in", numbers), ("phone", "in", numbers)], limit=1)
+        return partner
+
+    @api.model
+    def _cron_backfill_whatsapp_e164(self, chunk_size=50000):
+        """Fill the normalized phone columns with set-based updates over id ranges."""
+        params = self.env["ir.config_parameter"].sudo()
+        last_id = int(params.get_param(BACKFILL_PARAM, 0) or 0)
+        if last_id < 0:
+            return True
+        auto_commit = not getattr(threading.current_thread(), "testing", False)
+        cr = self.env.cr
+        self.flush(["mobile", "phone"])
+        saved_at = monotonic()
+        while True:
+            cr.execute(
+                "SELECT max(id) FROM (SELECT id FROM res_partner WHERE id > %s ORDER BY id LIMIT %s) AS chunk",
+                (last_id, chunk_size),
+            )
+            upper_id = cr.fetchone()[0]
+            if upper_id is None:
+                # Marks the backfill as done; the cron is a one-shot (numbercall 1) and deactivates itself.
+                params.set_param(BACKFILL_PARAM, -1)
+                break
+            # Mirrors normalize_whatsapp_number().
+            cr.execute(
+                r"""
+                UPDATE res_partner
+                   SET whatsapp_mobile_e164 = NULLIF('+' || regexp_replace(regexp_replace(mobile, '^\s*00', ''), '\D', '', 'g'), '+'),
+                       whatsapp_phone_e164 = NULLIF('+' || regexp_replace(regexp_replace(phone, '^\s*00', ''), '\D', '', 'g'), '+')
+                 WHERE id > %s AND id <= %s
+                """,
+                (last_id, upper_id),
+            )
+            _logger.info("WhatsApp phone backfill: normalized partners up to id %s", upper_id)
+            last_id = upper_id
+            if monotonic() - saved_at > BACKFILL_SAVE_INTERVAL:
+                # Progress survives an interrupted run without flushing caches on every chunk.
+                params.set_param(BACKFILL_PARAM, last_id)
+                saved_at = monotonic()
+            if auto_commit:
+                cr.commit()
+        self.invalidate_cache(["whatsapp_mobile_e164", "whatsapp_phone_e164"])
+        return True
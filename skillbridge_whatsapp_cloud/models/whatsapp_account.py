@@ -1,4 +1,12 @@
-from odoo import fields, models
+import zlib
+
+from odoo import api, fields, models, tools
+
+from ..tools import graph_client
+
+# Meta lets new numbers send well above this; keep a conservative default until tuned per account.
+DEFAULT_MESSAGES_PER_SECOND = 20
+DEFAULT_TRANSACTIONAL_RESERVE = 20
 
 
 class WhatsAppAccount(models.Model):
@@ -25,3 +33,78 @@ class WhatsAppAccount(models.Model):
         default=False,
         help="If enabled, this account is used by default for the company when sending messages.",
     )
+    messages_per_second = fields.Integer(
+        string="Messages per Second",
+        default=DEFAULT_MESSAGES_PER_SECOND,
+        help="Global sending budget of this phone number, shared by all running campaigns.",
+    )
+    transactional_reserve = fields.Integer(
+        string="Transactional Reserve (%)",
+        default=DEFAULT_TRANSACTIONAL_RESERVE,
+        help="Share of the budget campaigns never use, kept free for order, invoice and inbox messages.",
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        accounts = super().create(vals_list)
+        self.clear_caches()
+        graph_client.clear_clients()
+        return accounts
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.clear_caches()
+        graph_client.clear_clients()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        graph_client.clear_clients()
+        return res
+
+    @api.model
+    @tools.ormcache("company_id")
+    def _resolve_credentials(self, company_id):
+        """``(token, phone_number_id, account id)`` used to send for a company, memoized per worker.
+
+        The default account of the company wins, otherwise the Settings values apply
+        (account id False). Changing an account clears the cache; so does changing a
+        system parameter, which clears the caches as well.
+        """
+        account = self.sudo().search(
+            [
+                ("company_id", "=", company_id),
+                ("is_default", "=", True),
+                ("token", "!=", False),
+                ("phone_number_id", "!=", False),
+            ],
+            limit=1,
+        )
+        if account:
+            return account.token, account.phone_number_id, account.id
+        params = self.env["ir.config_parameter"].sudo()
+        return (
+            params.get_param("skillbridge_whatsapp_cloud.token") or "",
+            params.get_param("skillbridge_whatsapp_cloud.phone_number_id") or "",
+            False,
+        )
+
+    @api.model
+    def _get_company_account(self, company=None):
+        """Default account of ``company`` (current company by default), or an empty recordset."""
+        return self.browse(self._resolve_credentials((company or self.env.company).id)[2])
+
+    @api.model
+    def _get_campaign_rate(self, phone_number_id):
+        """Messages per second campaigns may use on ``phone_number_id`` once the transactional reserve is set aside."""
+        account = self.sudo().search([("phone_number_id", "=", phone_number_id)], limit=1)
+        rate = account.messages_per_second if account and account.messages_per_second > 0 else DEFAULT_MESSAGES_PER_SECOND
+        reserve = account.transactional_reserve if account else DEFAULT_TRANSACTIONAL_RESERVE
+        return max(0.1, rate * (100 - min(max(reserve, 0), 100)) / 100.0)
+
+    def _try_sender_lock(self, phone_number_id):
+        """Transaction-level advisory lock on a sender number; released by the caller's next commit or rollback."""
+        key = zlib.crc32(f"whatsapp.sender:{phone_number_id}".encode("utf-8"))
+        self.env.cr.execute("SELECT pg_try_advisory_xact_lock(%s)", (key,))
+        return self.env.cr.fetchone()[0]
@@ -1,5 +1,8 @@
+import functools
 import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Tuple
 
 import requests
@@ -7,6 +10,8 @@ import requests
 from odoo import _, models
 from odoo.exceptions import UserError
 
+from ..tools import graph_client, throughput
+
 _logger = logging.getLogger(__name__)
 
 
@@ -20,16 +25,10 @@ class WhatsAppAPI(models.Model):
             == "True"
         )
         if auto_send:
-            for order in self:
-                try:
-                    order._send_whatsapp_payloads(
-                        message_body=order._get_default_whatsapp_message(),
-                        message_mode="text",
-                        include_sale_order_pdf=True,
-                        include_invoice_pdf=False,
-                    )
-                except Exception as exc:
-                    _logger.warning("Auto WhatsApp send on confirm failed for %s: %s", order.name, exc)
+            # Delivered after commit by the outbox dispatcher, so confirmation never waits on Meta.
+            self.env["whatsapp.outbox"].sudo()._enqueue(
+                self, "order_confirm", include_sale_order_pdf=True, include_invoice_pdf=False
+            )
         return res
 
     def action_send_whatsapp(self):
@@ -57,31 +56,14 @@ class WhatsAppAPI(models.Model):
         }
 
     def _get_whatsapp_credentials(self) -> Tuple[str, str]:
-        company = self.env.company
-        account = (
-            self.env["whatsapp.account"]
-            .sudo()
-            .search(
-                [
-                    ("company_id", "=", company.id),
-                    ("is_default", "=", True),
-                    ("token", "!=", False),
-                    ("phone_number_id", "!=", False),
-                ],
-                limit=1,
-            )
-        )
-        if account:
-            return account.token, account.phone_number_id
-        token = self.env["ir.config_parameter"].sudo().get_param("skillbridge_whatsapp_cloud.token")
-        phone_number_id = self.env["ir.config_parameter"].sudo().get_param("skillbridge_whatsapp_cloud.phone_number_id")
+        token, phone_number_id, _account_id = self.env["whatsapp.account"]._resolve_credentials(self.env.company.id)
         if not token or not phone_number_id:
             raise UserError(_("WhatsApp API credentials are not configured in Settings."))
         return token, phone_number_id
 
     def _get_whatsapp_mobile(self) -> str:
         self.ensure_one()
-        mobile = (self.partner_id.mobile or "").strip()
+        mobile = self.partner_id._get_whatsapp_number() or ""
         if not mobile:
             raise UserError(_("The customer mobile number is missing on this order."))
         if not re.match(r"^\+?[1-9]\d{6,14}$", mobile):
@@ -91,7 +73,7 @@ class WhatsAppAPI(models.Model):
         return mobile
 
     def _send_whatsapp_text(self, mobile, token, phone_number_id, message_body):
-        url = f"https://graph.facebook.com/v20.0/{phone_number_id}/messages"
+        url = graph_client.graph_url(phone_number_id, "messages")
         headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
@@ -103,12 +85,12 @@ class WhatsAppAPI(models.Model):
             "text": {"body": message_body},
         }
         response = self._dispatch_whatsapp_request(
-            url, headers=headers, json=payload, timeout=10, return_response=True
+            url, headers=headers, json=payload, return_response=True
         )
         return self._extract_message_id(response)
 
     def _send_whatsapp_template(self, mobile, token, phone_number_id, template, components=None):
-        url = f"https://graph.facebook.com/v20.0/{phone_number_id}/messages"
+        url = graph_client.graph_url(phone_number_id, "messages")
         headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
@@ -124,12 +106,12 @@ class WhatsAppAPI(models.Model):
             },
         }
         response = self._dispatch_whatsapp_request(
-            url, headers=headers, json=payload, timeout=10, return_response=True
+            url, headers=headers, json=payload, return_response=True
         )
         return self._extract_message_id(response)
 
     def _send_whatsapp_interactive_buttons(self, mobile, token, phone_number_id, body_text, buttons):
-        url = f"https://graph.facebook.com/v20.0/{phone_number_id}/messages"
+        url = graph_client.graph_url(phone_number_id, "messages")
         headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
@@ -156,12 +138,12 @@ class WhatsAppAPI(models.Model):
             },
         }
         response = self._dispatch_whatsapp_request(
-            url, headers=headers, json=payload, timeout=10, return_response=True
+            url, headers=headers, json=payload, return_response=True
         )
         return self._extract_message_id(response)
 
     def _send_whatsapp_interactive_list(self, mobile, token, phone_number_id, body_text, list_payload):
-        url = f"https://graph.facebook.com/v20.0/{phone_number_id}/messages"
+        url = graph_client.graph_url(phone_number_id, "messages")
         headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
@@ -187,12 +169,12 @@ class WhatsAppAPI(models.Model):
             },
         }
         response = self._dispatch_whatsapp_request(
-            url, headers=headers, json=payload, timeout=10, return_response=True
+            url, headers=headers, json=payload, return_response=True
         )
         return self._extract_message_id(response)
 
     def _send_whatsapp_image(self, mobile, token, phone_number_id, media_url, caption=None):
-        url = f"https://graph.facebook.com/v20.0/{phone_number_id}/messages"
+        url = graph_client.graph_url(phone_number_id, "messages")
         headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
@@ -207,74 +189,181 @@ class WhatsAppAPI(models.Model):
             },
         }
         response = self._dispatch_whatsapp_request(
-            url, headers=headers, json=payload, timeout=15, return_response=True
+            url, headers=headers, json=payload, return_response=True
         )
         return self._extract_message_id(response)
 
     def _upload_whatsapp_media(
         self, file_content, filename, token, phone_number_id, mimetype="application/pdf"
     ):
-        url = f"https://graph.facebook.com/v20.0/{phone_number_id}/media"
+        try:
+            return self._post_whatsapp_media(file_content, filename, token, phone_number_id, mimetype)
+        except graph_client.GraphAPIError as error:
+            raise self._whatsapp_user_error(error) from error
+
+    def _post_whatsapp_media(self, file_content, filename, token, phone_number_id, mimetype="application/pdf"):
+        url = graph_client.graph_url(phone_number_id, "media")
         headers = {"Authorization": f"Bearer {token}"}
         files = {
             "file": (filename, file_content, mimetype),
         }
         data = {"messaging_product": "whatsapp"}
-        response = self._dispatch_whatsapp_request(
-            url, headers=headers, files=files, data=data, timeout=30, return_response=True
-        )
+        response = self._post_graph(url, headers=headers, files=files, data=data)
         try:
             media_id = response.json().get("id")
         except ValueError:
             media_id = None
         if not media_id:
-            raise UserError(_("Failed to upload media to WhatsApp."))
+            raise graph_client.GraphAPIError("Failed to upload media to WhatsApp.", status_code=response.status_code)
         return media_id
 
     def _send_whatsapp_document(self, mobile, token, phone_number_id, file_content, filename, caption=None):
-        media_id = self._upload_whatsapp_media(file_content, filename, token, phone_number_id)
-        url = f"https://graph.facebook.com/v20.0/{phone_number_id}/messages"
+        """Send a document, uploading it only when this content has no valid media id yet."""
+        document = (lambda: (file_content, filename), caption)
+        sent, error = self._send_whatsapp_documents(mobile, token, phone_number_id, [document])
+        if error:
+            self._raise_whatsapp_error(error)
+        return sent[0][0] if sent else None
+
+    def _send_whatsapp_documents(self, mobile, token, phone_number_id, documents):
+        """Send ``documents`` (``(render, caption)`` pairs) in order, overlapping render and network.
+
+        Rendering runs here, where the ORM is available, while a single pipeline thread
+        uploads and sends the previous document; one thread keeps the messages in order.
+        Uploads are skipped for content already in the media cache. The first failure
+        stops the documents after it; those before it are still sent. Returns ``(sent, error)`` where ``sent`` lists the
+        ``(message id, caption)`` of the documents delivered to the API.
+        """
+        media_cache = self.env["whatsapp.media.cache"].sudo()
+        abort = threading.Event()
+        jobs = []
+        error = None
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="whatsapp_documents") as pool:
+            for render, caption in documents:
+                if abort.is_set():
+                    break
+                try:
+                    content, filename = render()
+                except Exception as exc:
+                    # Stop rendering, but let the documents already submitted go out: only a
+                    # transmit failure cancels queued jobs (``abort``).
+                    error = exc
+                    break
+                digest = media_cache._digest(content)
+                job = {
+                    "mobile": mobile,
+                    "token": token,
+                    "phone_number_id": phone_number_id,
+                    "content": content,
+                    "filename": filename,
+                    "caption": caption,
+                    "digest": digest,
+                    "media_id": media_cache._lookup(phone_number_id, digest),
+                }
+                jobs.append(job)
+                pool.submit(self._transmit_document, job, abort)
+        sent = []
+        for job in jobs:
+            if job.get("stale_media"):
+                media_cache._invalidate(phone_number_id, job["digest"])
+            if job.get("uploaded"):
+                media_cache._store(phone_number_id, job["digest"], job["media_id"])
+            if job.get("msg_id"):
+                sent.append((job["msg_id"], job["caption"]))
+            error = error or job.get("error")
+        return sent, error
+
+    def _transmit_document(self, job, abort):
+        """Upload (when needed) and send one document. Runs on the pipeline thread: no ORM access here."""
+        if abort.is_set():
+            return job
+        try:
+            if job["media_id"]:
+                try:
+                    job["msg_id"] = self._post_whatsapp_document(job)
+                    return job
+                except graph_client.GraphAPIError as error:
+                    if error.code not in graph_client.MEDIA_ERROR_CODES:
+                        raise
+                    # Meta dropped the media earlier than expected: upload it again once.
+                    job["stale_media"] = True
+            job["media_id"] = self._post_whatsapp_media(
+                job["content"], job["filename"], job["token"], job["phone_number_id"]
+            )
+            job["uploaded"] = True
+            job["msg_id"] = self._post_whatsapp_document(job)
+        except Exception as error:
+            job["error"] = error
+            abort.set()
+        return job
+
+    def _post_whatsapp_document(self, job):
+        url = graph_client.graph_url(job["phone_number_id"], "messages")
         headers = {
-            "Authorization": f"Bearer {token}",
+            "Authorization": f"Bearer {job['token']}",
             "Content-Type": "application/json",
         }
         payload = {
             "messaging_product": "whatsapp",
-            "to": mobile,
+            "to": job["mobile"],
             "type": "document",
             "document": {
-                "id": media_id,
-                "filename": filename,
-                "caption": caption or "",
+                "id": job["media_id"],
+                "filename": job["filename"],
+                "caption": job["caption"] or "",
             },
         }
-        response = self._dispatch_whatsapp_request(
-            url, headers=headers, json=payload, timeout=15, return_response=True
-        )
-        return self._extract_message_id(response)
+        return self._extract_message_id(self._post_graph(url, headers=headers, json=payload))
 
     def _dispatch_whatsapp_request(self, url, **kwargs):
         return_response = kwargs.pop("return_response", False)
         try:
-            response = requests.post(url, **kwargs)
-        except requests.RequestException as exc:
-            _logger.exception("WhatsApp request failed for sale.order %s", getattr(self, "name", ""))
-            raise UserError(_("Failed to reach WhatsApp API: %s") % exc)
+            response = self._post_graph(url, **kwargs)
+        except graph_client.GraphAPIError as error:
+            raise self._whatsapp_user_error(error) from error
+        return response if return_response else True
 
+    @staticmethod
+    def _post_graph(url, **kwargs):
+        """POST to the Graph API through the number's circuit breaker; raises GraphAPIError on failure.
+
+        Plain HTTP without ORM or translations, so it is safe on worker threads.
+        """
+        breaker = throughput.get_breaker(graph_client.url_node(url))
+        if not breaker.allow():
+            raise graph_client.GraphAPIError("Circuit open", retry_after=breaker.retry_in())
+        try:
+            response = graph_client.post(url, **kwargs)
+        except requests.RequestException as exc:
+            breaker.record_failure()
+            raise graph_client.GraphAPIError(str(exc)) from exc
         if not response.ok:
-            try:
-                detail = response.json()
-                err_message = detail.get("error", {}).get("message") or response.text
-            except ValueError:
-                err_message = response.text
-            _logger.warning(
-                "WhatsApp API error for sale.order %s: status=%s, response=%s",
-                getattr(self, "name", ""),
-                response.status_code,
-                err_message,
-            )
-            raise UserError(_("WhatsApp API error (%s): %s") % (response.status_code, err_message))
-        return response if return_response else True
+            error = graph_client.error_from_response(response)
+            if error.kind == graph_client.TRANSIENT:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise error
+        breaker.record_success()
+        return response
+
+    def _raise_whatsapp_error(self, error):
+        if isinstance(error, graph_client.GraphAPIError):
+            raise self._whatsapp_user_error(error) from error
+        raise error
+
+    def _whatsapp_user_error(self, error):
+        """Translate a GraphAPIError into the UserError shown to users (chain it with ``from error``)."""
+        name = getattr(self, "name", "")
+        if isinstance(error.__cause__, requests.RequestException):
+            _logger.warning("WhatsApp request failed for sale.order %s: %s", name, error.__cause__)
+            return UserError(_("Failed to reach WhatsApp API: %s") % error.__cause__)
+        if error.status_code is None:
+            return UserError(_("The WhatsApp API is currently unavailable. Please try again in a few minutes."))
+        _logger.warning(
+            "WhatsApp API error for sale.order %s: status=%s, response=%s", name, error.status_code, error.message
+        )
+        return UserError(_("WhatsApp API error (%s): %s") % (error.status_code, error.message))
 
     def _extract_message_id(self, response: requests.Response) -> Optional[str]:
         try:
@@ -291,7 +380,7 @@ class WhatsAppAPI(models.Model):
         report = self.env.ref("sale.action_report_saleorder", raise_if_not_found=False)
         if not report:
             raise UserError(_("Sale order PDF report is missing."))
-        pdf_content, _report_format = report._render_qweb_pdf(self.id)
+        pdf_content = self.env["whatsapp.pdf.cache"].sudo()._get_pdf(report, self)
         filename = f"{self.name or 'sale_order'}.pdf"
         return pdf_content, filename
 
@@ -307,7 +396,7 @@ class WhatsAppAPI(models.Model):
         )
         if not report or report._name != "ir.actions.report":
             raise UserError(_("Invoice PDF report is missing."))
-        pdf_content, _report_format = report._render_qweb_pdf(invoice.id)
+        pdf_content = self.env["whatsapp.pdf.cache"].sudo()._get_pdf(report, invoice)
         filename = f"{invoice.name or 'invoice'}.pdf"
         return pdf_content, filename
 
@@ -322,114 +411,120 @@ class WhatsAppAPI(models.Model):
         include_sale_order_pdf=True,
         include_invoice_pdf=False,
     ):
+        self.ensure_one()
+        _sent_parts, log_vals, error = self._send_whatsapp_parts(
+            message_body,
+            message_mode=message_mode,
+            template=template,
+            template_components=template_components,
+            buttons=buttons,
+            list_payload=list_payload,
+            include_sale_order_pdf=include_sale_order_pdf,
+            include_invoice_pdf=include_invoice_pdf,
+        )
+        self.env["whatsapp.message.log"].sudo().create(log_vals)
+        if error:
+            self._raise_whatsapp_error(error)
+
+    def _send_whatsapp_parts(
+        self,
+        message_body,
+        message_mode="text",
+        template=None,
+        template_components=None,
+        buttons=None,
+        list_payload=None,
+        include_sale_order_pdf=True,
+        include_invoice_pdf=False,
+        skip_parts=0,
+    ):
+        """Send the main message, then the documents, skipping the first ``skip_parts`` parts.
+
+        The main message is part 0 and each document the next part. Errors raised before
+        anything is sent propagate; a failure after that is returned so the caller can keep
+        the parts already delivered. Returns ``(sent_parts, log_vals, error)`` where
+        ``sent_parts`` counts the parts sent by this call.
+        """
         self.ensure_one()
         mobile = self._get_whatsapp_mobile()
         token, phone_number_id = self._get_whatsapp_credentials()
 
         buttons = buttons or []
         list_payload = list_payload or {}
-        log_model = self.env["whatsapp.message.log"].sudo()
+        sent_parts = 0
+        log_vals = []
 
         # Send main message
-        main_msg_id = None
-        message_type = "text"
-        message_summary = message_body
-        template_name = ""
-        if message_mode == "template":
-            if not template:
-                raise UserError(_("Please select a template to send."))
-            main_msg_id = self._send_whatsapp_template(
-                mobile, token, phone_number_id, template, components=template_components
-            )
-            message_type = "template"
-            template_name = template.template_name or ""
-            message_summary = template.name or template.template_name or ""
-        elif message_mode == "interactive_button":
-            if not buttons:
-                raise UserError(_("Please add at least one button."))
-            main_msg_id = self._send_whatsapp_interactive_buttons(
-                mobile, token, phone_number_id, message_body, buttons
-            )
-            message_type = "interactive_button"
-        elif message_mode == "interactive_list":
-            if not list_payload.get("rows"):
-                raise UserError(_("Please provide at least one list row."))
-            main_msg_id = self._send_whatsapp_interactive_list(
-                mobile, token, phone_number_id, message_body, list_payload
-            )
-            message_type = "interactive_list"
-        elif message_mode == "media_image":
-            if not list_payload.get("media_url"):
-                raise UserError(_("Please provide an image URL to send."))
-            main_msg_id = self._send_whatsapp_image(mobile, token, phone_number_id, list_payload["media_url"], message_body)
-            message_type = "image"
-            if not message_summary:
-                message_summary = _("Image")
-        else:
-            main_msg_id = self._send_whatsapp_text(mobile, token, phone_number_id, message_body)
-
-        if main_msg_id:
-            log_model.create(
-                {
-                    "message_id": main_msg_id,
-                    "order_id": self.id,
-                    "partner_id": self.partner_id.id,
-                    "direction": "outbound",
-                    "status": "sent",
-                    "message_body": message_summary or "",
-                    "message_type": message_type,
-                    "template_name": template_name,
-                }
-            )
+        if not skip_parts:
+            main_msg_id = None
+            message_type = "text"
+            message_summary = message_body
+            template_name = ""
+            if message_mode == "template":
+                if not template:
+                    raise UserError(_("Please select a template to send."))
+                main_msg_id = self._send_whatsapp_template(
+                    mobile, token, phone_number_id, template, components=template_components
+                )
+                message_type = "template"
+                template_name = template.template_name or ""
+                message_summary = template.name or template.template_name or ""
+            elif message_mode == "interactive_button":
+                if not buttons:
+                    raise UserError(_("Please add at least one button."))
+                main_msg_id = self._send_whatsapp_interactive_buttons(
+                    mobile, token, phone_number_id, message_body, buttons
+                )
+                message_type = "interactive_button"
+            elif message_mode == "interactive_list":
+                if not list_payload.get("rows"):
+                    raise UserError(_("Please provide at least one list row."))
+                main_msg_id = self._send_whatsapp_interactive_list(
+                    mobile, token, phone_number_id, message_body, list_payload
+                )
+                message_type = "interactive_list"
+            elif message_mode == "media_image":
+                if not list_payload.get("media_url"):
+                    raise UserError(_("Please provide an image URL to send."))
+                main_msg_id = self._send_whatsapp_image(
+                    mobile, token, phone_number_id, list_payload["media_url"], message_body
+                )
+                message_type = "image"
+                if not message_summary:
+                    message_summary = _("Image")
+            else:
+                main_msg_id = self._send_whatsapp_text(mobile, token, phone_number_id, message_body)
+            sent_parts += 1
+            if main_msg_id:
+                log_vals.append(self._prepare_whatsapp_log_vals(main_msg_id, message_summary, message_type, template_name))
 
+        documents = []
         if include_sale_order_pdf:
-            sale_pdf, sale_filename = self._render_sale_order_pdf()
-            sale_msg_id = self._send_whatsapp_document(
-                mobile,
-                token,
-                phone_number_id,
-                sale_pdf,
-                sale_filename,
-                caption=_("Sales Order %(number)s") % {"number": self.name},
-            )
-            if sale_msg_id:
-                caption = _("Sales Order %(number)s") % {"number": self.name}
-                log_model.create(
-                    {
-                        "message_id": sale_msg_id,
-                        "order_id": self.id,
-                        "partner_id": self.partner_id.id,
-                        "direction": "outbound",
-                        "status": "sent",
-                        "message_body": caption,
-                        "message_type": "document",
-                    }
-                )
+            caption = _("Sales Order %(number)s") % {"number": self.name}
+            documents.append((self._render_sale_order_pdf, caption))
+        invoices = self._get_invoice_candidates() if include_invoice_pdf else self.env["account.move"]
+        for invoice in invoices:
+            caption = _("Invoice %(number)s") % {"number": invoice.name or invoice.ref or ""}
+            documents.append((functools.partial(self._render_invoice_pdf, invoice), caption))
+        documents = documents[max(skip_parts - 1, 0):]
 
-        if include_invoice_pdf:
-            invoices = self._get_invoice_candidates()
-            if not invoices:
-                raise UserError(_("No posted invoices are available for this order."))
-            for invoice in invoices:
-                invoice_pdf, invoice_filename = self._render_invoice_pdf(invoice)
-                caption = _("Invoice %(number)s") % {"number": invoice.name or invoice.ref or ""}
-                invoice_msg_id = self._send_whatsapp_document(
-                    mobile,
-                    token,
-                    phone_number_id,
-                    invoice_pdf,
-                    invoice_filename,
-                    caption=caption,
-                )
-                if invoice_msg_id:
-                    log_model.create(
-                        {
-                            "message_id": invoice_msg_id,
-                            "order_id": self.id,
-                            "partner_id": self.partner_id.id,
-                            "direction": "outbound",
-                            "status": "sent",
-                            "message_body": caption,
-                            "message_type": "document",
-                        }
-                    )
+        error = None
+        if documents:
+            sent, error = self._send_whatsapp_documents(mobile, token, phone_number_id, documents)
+            sent_parts += len(sent)
+            log_vals += [self._prepare_whatsapp_log_vals(msg_id, caption, "document") for msg_id, caption in sent]
+        if not error and include_invoice_pdf and not invoices:
+            error = UserError(_("No posted invoices are available for this order."))
+        return sent_parts, log_vals, error
+
+    def _prepare_whatsapp_log_vals(self, message_id, message_body, message_type, template_name=""):
+        return {
+            "message_id": message_id,
+            "order_id": self.id,
+            "partner_id": self.partner_id.id,
+            "direction": "outbound",
+            "status": "sent",
+            "message_body": message_body or "",
+            "message_type": message_type,
+            "template_name": template_name,
+        }
@@ -1,15 +1,33 @@
 import logging
 import re
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, time, timedelta
+from time import monotonic
 
-import requests
-
-from odoo import _, fields, models
+from odoo import _, api, fields, models
 from odoo.exceptions import UserError
 from odoo.tools.safe_eval import safe_eval
 
+from ..tools import graph_client, throughput
+
 _logger = logging.getLogger(__name__)
 MOBILE_PATTERN = re.compile(r"^\+?[1-9]\d{6,14}$")
+# Upper bound for concurrent Graph calls per batch; stays below the pooled session size.
+MAX_DISPATCH_CONCURRENCY = 16
+# How long a claimed queue line stays reserved for the worker that leased it.
+LEASE_SECONDS = 900
+DISPATCHER_CRON = "skillbridge_whatsapp_cloud.ir_cron_whatsapp_campaign_dispatcher"
+# Continuous mode: short ticks, bounded run per cron job (below limit_time_real) and the retry
+# delay used when lines are due but cannot be sent (sending window, open circuit, busy number).
+CONTINUOUS_TICK_SECONDS = 10
+CONTINUOUS_RUN_SECONDS = 50
+CONTINUOUS_IDLE_SECONDS = 30
+# Minimum delay before a throttled line is tried again when the API sends no Retry-After.
+THROTTLE_RETRY_SECONDS = 60
+# Partners handled per INSERT by the set-based queue generator.
+QUEUE_CHUNK_SIZE = 10000
 
 
 class WhatsAppCampaign(models.Model):
@@ -33,6 +51,21 @@ class WhatsAppCampaign(models.Model):
         default="[]",
     )
     throttle_batch_size = fields.Integer(string="Batch Size", default=50)
+    account_id = fields.Many2one(
+        "whatsapp.account",
+        string="Sending Account",
+        help="WhatsApp account used for this campaign. Defaults to the company's default account.",
+    )
+    priority = fields.Integer(
+        string="Priority Weight",
+        default=10,
+        help="Relative share of the sending number's throughput when several campaigns run at once.",
+    )
+    dispatch_concurrency = fields.Integer(
+        string="Concurrent Sends",
+        default=1,
+        help="Number of messages of a batch sent in parallel (1 sends them one after another, max 16).",
+    )
     window_start = fields.Float(string="Send Window Start (hour)", help="0-24 in server timezone", default=8.0)
     window_end = fields.Float(string="Send Window End (hour)", help="0-24 in server timezone", default=20.0)
     state = fields.Selection(
@@ -42,9 +75,21 @@ class WhatsAppCampaign(models.Model):
         index=True,
     )
     last_run = fields.Datetime(string="Last Run")
-    next_run = fields.Datetime(string="Next Run")
+    next_run = fields.Datetime(string="Next Run", help="The campaign does not send before this time.")
     queue_ids = fields.One2many("whatsapp.campaign.queue", "campaign_id", string="Queue Lines")
     step_ids = fields.One2many("whatsapp.campaign.step", "campaign_id", string="Drip Steps")
+    queue_generation_state = fields.Selection(
+        [("idle", "Not Started"), ("queued", "Queued"), ("running", "In Progress"), ("done", "Done")],
+        string="Queue Generation",
+        default="idle",
+        required=True,
+        readonly=True,
+    )
+    queue_generation_cursor = fields.Integer(readonly=True, help="Last partner id scanned by the queue generator.")
+    queue_generation_scanned = fields.Integer(string="Partners Scanned", readonly=True)
+    queue_generation_total = fields.Integer(string="Audience Size", readonly=True)
+    queue_generated_count = fields.Integer(string="Lines Added", readonly=True)
+    queue_generation_progress = fields.Float(string="Generation Progress", compute="_compute_queue_generation_progress")
     total_pending = fields.Integer(compute="_compute_totals", store=False)
     total_sent = fields.Integer(compute="_compute_totals", store=False)
     total_failed = fields.Integer(compute="_compute_totals", store=False)
@@ -53,35 +98,134 @@ class WhatsAppCampaign(models.Model):
 
     def action_generate_queue(self):
         for campaign in self:
-            domain = [("mobile", "!=", False)]
-            if campaign.partner_tag_ids:
-                domain.append(("category_id", "in", campaign.partner_tag_ids.ids))
+            domain = campaign._get_audience_domain()
+            first_step_id = campaign._get_first_step().id or False
+            campaign._reset_queue_generation("running")
+            while campaign._generate_queue_chunk(domain, first_step_id):
+                pass
+            campaign.queue_generation_state = "done"
+        return True
+
+    def action_generate_queue_background(self):
+        for campaign in self:
+            campaign._get_audience_domain()
+            campaign._reset_queue_generation("queued")
+        self.env.ref("skillbridge_whatsapp_cloud.ir_cron_whatsapp_queue_generation")._trigger()
+        return True
+
+    @api.model
+    def _cron_generate_queues(self):
+        """Run queued audience generations in chunks, committing progress after each chunk."""
+        auto_commit = not getattr(threading.current_thread(), "testing", False)
+        for campaign in self.search([("queue_generation_state", "in", ("queued", "running"))]):
             try:
-                extra_domain = safe_eval(campaign.partner_domain or "[]")
-                domain += extra_domain
-            except Exception:
-                raise UserError(_("Invalid partner domain syntax."))
-            partners = self.env["res.partner"].search(domain)
-            existing_partner_ids = set(campaign.queue_ids.mapped("partner_id").ids)
-            to_create = []
-            for partner in partners:
-                if partner.id in existing_partner_ids:
-                    continue
-                to_create.append(
-                    {
-                        "campaign_id": campaign.id,
-                        "partner_id": partner.id,
-                        "status": "pending",
-                        "step_id": campaign._get_first_step().id if campaign._get_first_step() else False,
-                        "next_attempt_at": fields.Datetime.now(),
-                    }
-                )
-            if to_create:
-                self.env["whatsapp.campaign.queue"].create(to_create)
+                domain = campaign._get_audience_domain()
+            except UserError as exc:
+                _logger.warning("Queue generation skipped for campaign %s: %s", campaign.id, exc)
+                campaign.queue_generation_state = "idle"
+                continue
+            first_step_id = campaign._get_first_step().id or False
+            campaign.queue_generation_state = "running"
+            while campaign._generate_queue_chunk(domain, first_step_id):
+                if auto_commit:
+                    self.env.cr.commit()
+            campaign.queue_generation_state = "done"
+            if auto_commit:
+                self.env.cr.commit()
         return True
 
+    def _get_audience_domain(self):
+        self.ensure_one()
+        # Raw mobile as well: partners not reached by the phone backfill yet have no normalized key.
+        domain = ["|", ("whatsapp_mobile_e164", "!=", False), ("mobile", "!=", False)]
+        if self.partner_tag_ids:
+            domain.append(("category_id", "in", self.partner_tag_ids.ids))
+        try:
+            extra_domain = safe_eval(self.partner_domain or "[]")
+            domain += extra_domain
+        except Exception:
+            raise UserError(_("Invalid partner domain syntax."))
+        return domain
+
+    def _reset_queue_generation(self, state):
+        self.ensure_one()
+        self.write(
+            {
+                "queue_generation_state": state,
+                "queue_generation_cursor": 0,
+                "queue_generation_scanned": 0,
+                "queue_generated_count": 0,
+                "queue_generation_total": self.env["res.partner"].search_count(self._get_audience_domain()),
+            }
+        )
+
+    def _generate_queue_chunk(self, domain, first_step_id, chunk_size=QUEUE_CHUNK_SIZE):
+        """Insert the missing queue lines for the next slice of the audience.
+
+        Partners are scanned by id from the stored cursor, so an interrupted background
+        run resumes where it stopped. Returns the number of partners scanned (0 when done).
+        """
+        self.ensure_one()
+        partner_ids = (
+            self.env["res.partner"]
+            .search(domain + [("id", ">", self.queue_generation_cursor)], order="id", limit=chunk_size)
+            .ids
+        )
+        if not partner_ids:
+            return 0
+        now = fields.Datetime.now()
+        self.env.cr.execute(
+            """
+            INSERT INTO whatsapp_campaign_queue
+                        (campaign_id, partner_id, status, step_id, attempts, next_attempt_at,
+                         create_uid, create_date, write_uid, write_date)
+                 SELECT %(campaign_id)s, partner.id, 'pending', %(step_id)s, 0, %(now)s,
+                        %(uid)s, %(now)s, %(uid)s, %(now)s
+                   FROM unnest(%(partner_ids)s) AS partner(id)
+                  WHERE NOT EXISTS (
+                        SELECT 1
+                          FROM whatsapp_campaign_queue line
+                         WHERE line.campaign_id = %(campaign_id)s AND line.partner_id = partner.id
+                        )
+            ON CONFLICT (campaign_id, partner_id) DO NOTHING
+            """,
+            {
+                "campaign_id": self.id,
+                "step_id": first_step_id,
+                "now": now,
+                "uid": self.env.uid,
+                "partner_ids": partner_ids,
+            },
+        )
+        inserted = self.env.cr.rowcount
+        self.env["whatsapp.campaign.queue"].invalidate_cache()
+        self.invalidate_cache(["queue_ids"])
+        self.write(
+            {
+                "queue_generation_cursor": partner_ids[-1],
+                "queue_generation_scanned": self.queue_generation_scanned + len(partner_ids),
+                "queue_generated_count": self.queue_generated_count + inserted,
+            }
+        )
+        return len(partner_ids)
+
+    @api.depends("queue_generation_scanned", "queue_generation_total", "queue_generation_state")
+    def _compute_queue_generation_progress(self):
+        for rec in self:
+            if rec.queue_generation_state == "done":
+                rec.queue_generation_progress = 100.0
+            elif rec.queue_generation_total:
+                rec.queue_generation_progress = min(100.0, 100.0 * rec.queue_generation_scanned / rec.queue_generation_total)
+            else:
+                rec.queue_generation_progress = 0.0
+
     def action_start(self):
-        self.write({"state": "running", "next_run": fields.Datetime.now()})
+        now = fields.Datetime.now()
+        for campaign in self:
+            # Keep a start time planned in the future; otherwise start right away.
+            next_run = campaign.next_run if campaign.next_run and campaign.next_run > now else now
+            campaign.write({"state": "running", "next_run": next_run})
+        self._trigger_dispatcher()
         return True
 
     def action_pause(self):
@@ -93,13 +237,29 @@ class WhatsAppCampaign(models.Model):
         return True
 
     def _compute_totals(self):
+        """Count queue lines and delivery logs with one grouped query each for the whole batch."""
+        campaign_ids = self._origin.ids
+        queue_counts = defaultdict(int)
+        log_counts = defaultdict(int)
+        if campaign_ids:
+            for group in self.env["whatsapp.campaign.queue"].sudo().read_group(
+                [("campaign_id", "in", campaign_ids)], ["campaign_id"], ["campaign_id", "status"], lazy=False
+            ):
+                queue_counts[(group["campaign_id"][0], group["status"])] = group["__count"]
+            for group in self.env["whatsapp.message.log"].sudo().read_group(
+                [("campaign_id", "in", campaign_ids), ("status", "in", ["delivered", "read"])],
+                ["campaign_id"],
+                ["campaign_id", "status"],
+                lazy=False,
+            ):
+                log_counts[(group["campaign_id"][0], group["status"])] = group["__count"]
         for rec in self:
-            rec.total_pending = len(rec.queue_ids.filtered(lambda queue_line: queue_line.status == "pending"))
-            rec.total_sent = len(rec.queue_ids.filtered(lambda queue_line: queue_line.status == "sent"))
-            rec.total_failed = len(rec.queue_ids.filtered(lambda queue_line: queue_line.status == "failed"))
-            logs = self.env["whatsapp.message.log"].sudo().search([("campaign_id", "=", rec.id)])
-            rec.total_delivered = len(logs.filtered(lambda log_line: log_line.status == "delivered"))
-            rec.total_read = len(logs.filtered(lambda log_line: log_line.status == "read"))
+            campaign_id = rec._origin.id
+            rec.total_pending = queue_counts[(campaign_id, "pending")]
+            rec.total_sent = queue_counts[(campaign_id, "sent")]
+            rec.total_failed = queue_counts[(campaign_id, "failed")]
+            rec.total_delivered = log_counts[(campaign_id, "delivered")]
+            rec.total_read = log_counts[(campaign_id, "read")]
 
     def _within_window(self):
         now = fields.Datetime.context_timestamp(self, datetime.utcnow()).time()
@@ -112,92 +272,385 @@ class WhatsAppCampaign(models.Model):
         return now >= start_time or now <= end_time
 
     def _cron_run_batch(self, limit=None):
-        campaigns = self.search([("state", "=", "running")])
-        for campaign in campaigns:
-            if not campaign._within_window():
-                continue
-            batch_limit = limit or campaign.throttle_batch_size or 50
+        """Periodic dispatch; also the fallback that re-arms the continuous dispatcher."""
+        self._dispatch_due_lines(limit=limit)
+        self._trigger_dispatcher()
+        return True
+
+    @api.model
+    def _dispatch_due_lines(self, limit=None, tick_seconds=None):
+        """Dispatch due lines of running campaigns, one sender phone number at a time.
+
+        Campaigns sharing a number split that number's messages-per-second budget by
+        priority weight, and their sends are interleaved and paced to the budget.
+        Returns the number of lines claimed.
+        """
+        auto_commit = not getattr(threading.current_thread(), "testing", False)
+        campaigns = self.search(
+            [("state", "=", "running"), "|", ("next_run", "=", False), ("next_run", "<=", fields.Datetime.now())]
+        ).filtered(lambda campaign: campaign._within_window())
+        handled = 0
+        for credentials, group in campaigns._group_by_sender().items():
+            handled += group._run_sender_batch(
+                credentials, limit=limit, auto_commit=auto_commit, tick_seconds=tick_seconds
+            )
+        return handled
+
+    @api.model
+    def _is_continuous_dispatch_enabled(self):
+        params = self.env["ir.config_parameter"].sudo()
+        return params.get_param("skillbridge_whatsapp_cloud.campaign_continuous_dispatch") == "True"
+
+    @api.model
+    def _trigger_dispatcher(self, at=None):
+        if not self._is_continuous_dispatch_enabled():
+            return
+        cron = self.env.ref(DISPATCHER_CRON, raise_if_not_found=False)
+        if cron:
+            cron._trigger(at)
+
+    @api.model
+    def _cron_dispatch_continuous(self):
+        """Drain due lines back to back, then sleep until the next line or campaign start is due."""
+        if not self._is_continuous_dispatch_enabled():
+            return True
+        deadline = monotonic() + CONTINUOUS_RUN_SECONDS
+        handled = 0
+        while monotonic() < deadline:
+            handled = self._dispatch_due_lines(tick_seconds=CONTINUOUS_TICK_SECONDS)
+            if not handled:
+                break
+        if handled:
+            # Stopped by the run deadline with work left: continue in a fresh cron job.
+            self._trigger_dispatcher()
+            return True
+        wake_at = self._next_dispatch_at()
+        if wake_at:
             now = fields.Datetime.now()
-            lines = campaign.queue_ids.filtered(
-                lambda queue_line: queue_line.status == "pending"
-                and (not queue_line.next_attempt_at or queue_line.next_attempt_at <= now)
-            )[:batch_limit]
-            if not lines:
-                campaign.write({"state": "done"})
-                continue
-            for line in lines:
-                campaign._send_line(line)
-            campaign.write({"last_run": fields.Datetime.now()})
+            self._trigger_dispatcher(wake_at if wake_at > now else now + timedelta(seconds=CONTINUOUS_IDLE_SECONDS))
         return True
 
+    @api.model
+    def _next_dispatch_at(self):
+        """Earliest time a pending line of a running campaign becomes sendable, or None."""
+        self.env["whatsapp.campaign.queue"].flush(["campaign_id", "status", "next_attempt_at"])
+        self.flush(["state", "next_run"])
+        # One index probe per running campaign (whatsapp_campaign_queue_due_idx) instead of scanning the queue.
+        self.env.cr.execute(
+            """
+            SELECT min(GREATEST(due.next_attempt_at, COALESCE(c.next_run, due.next_attempt_at)))
+              FROM whatsapp_campaign c
+              CROSS JOIN LATERAL (
+                    SELECT q.next_attempt_at
+                      FROM whatsapp_campaign_queue q
+                     WHERE q.campaign_id = c.id
+                       AND q.status = 'pending'
+                  ORDER BY q.next_attempt_at
+                     LIMIT 1
+                   ) due
+             WHERE c.state = 'running'
+            """
+        )
+        return self.env.cr.fetchone()[0]
+
+    def _group_by_sender(self):
+        groups = defaultdict(self.browse)
+        for campaign in self:
+            try:
+                credentials = campaign._get_whatsapp_credentials()
+            except UserError as exc:
+                _logger.warning("Campaign %s skipped: %s", campaign.id, exc)
+                continue
+            groups[credentials] |= campaign
+        return groups
+
+    def _run_sender_batch(self, credentials, limit=None, auto_commit=False, tick_seconds=None):
+        phone_number_id = credentials[1]
+        breaker = throughput.get_breaker(phone_number_id)
+        if breaker.is_open():
+            _logger.info(
+                "WhatsApp API unhealthy for %s: campaigns parked for %.0fs", phone_number_id, breaker.retry_in()
+            )
+            return 0
+        # Serialize only the claim of this number's lines (the lock ends with the lease commit below);
+        # workers then send their leased lines in parallel.
+        if not self.env["whatsapp.account"]._try_sender_lock(phone_number_id):
+            return 0
+        # The pacer adapts the rate to what the API accepts; the account budget is only its ceiling.
+        pacer = throughput.get_pacer(
+            phone_number_id, self.env["whatsapp.account"]._get_campaign_rate(phone_number_id)
+        )
+        tick_seconds = tick_seconds or int(
+            self.env["ir.config_parameter"].sudo().get_param("skillbridge_whatsapp_cloud.scheduler_tick_seconds", 60)
+        )
+        budget = int(pacer.rate * max(tick_seconds - pacer.pause_remaining(), 0))
+        # Lines other workers leased and are still sending use the same per-number budget.
+        budget = max(budget - self._count_leased_lines(), 0)
+        if breaker.tripped:
+            # Half-open: a single probe decides whether the number is healthy again.
+            budget = min(budget, 1)
+        demands = {campaign.id: limit or campaign.throttle_batch_size or 50 for campaign in self}
+        weights = {campaign.id: max(campaign.priority, 1) for campaign in self}
+        shares = throughput.fair_share(budget, demands, weights)
+
+        lines_by_campaign = {}
+        for campaign in self:
+            lines = campaign._claim_due_lines(shares[campaign.id]) if shares[campaign.id] else None
+            if lines:
+                lines_by_campaign[campaign.id] = lines
+            elif campaign.queue_generation_state not in ("queued", "running") and not campaign._has_pending_lines():
+                # A background generation may still add lines: only a complete queue can run dry.
+                campaign.write({"state": "done"})
+        if not lines_by_campaign:
+            return 0
+        if auto_commit:
+            # Publish the lease before sending so other workers skip these lines even after a crash.
+            self.env.cr.commit()
+
+        jobs_by_campaign = {}
+        for campaign in self.filtered(lambda rec: rec.id in lines_by_campaign):
+            jobs = [campaign._prepare_line(line, credentials) for line in lines_by_campaign[campaign.id]]
+            jobs_by_campaign[campaign.id] = [dict(job, pacer=pacer) for job in jobs if job]
+        jobs = throughput.interleave(jobs_by_campaign, weights)
+        self._execute_jobs(jobs, concurrency=max(self.mapped("dispatch_concurrency") or [1]))
+        for job in jobs:
+            job["campaign"]._apply_job_result(job)
+        claimed = self.env["whatsapp.campaign.queue"].concat(*lines_by_campaign.values())
+        claimed.write({"lease_until": False})
+        self.browse(list(lines_by_campaign)).write({"last_run": fields.Datetime.now()})
+        if auto_commit:
+            self.env.cr.commit()
+        return len(claimed)
+
+    def _count_leased_lines(self):
+        self.env["whatsapp.campaign.queue"].flush(["lease_until"])
+        self.env.cr.execute(
+            "SELECT count(*) FROM whatsapp_campaign_queue WHERE campaign_id IN %s AND lease_until > %s",
+            (tuple(self.ids), fields.Datetime.now()),
+        )
+        return self.env.cr.fetchone()[0]
+
+    def _claim_due_lines(self, limit):
+        """Lease up to ``limit`` due pending lines of this campaign.
+
+        Rows locked by a concurrent transaction are skipped (``SKIP LOCKED``) and the
+        lease keeps them away from other workers until it expires, which also recovers
+        lines left behind by a crashed worker.
+        """
+        self.ensure_one()
+        Queue = self.env["whatsapp.campaign.queue"]
+        Queue.flush(["status", "next_attempt_at", "lease_until"])
+        now = fields.Datetime.now()
+        self.env.cr.execute(
+            """
+            UPDATE whatsapp_campaign_queue
+               SET lease_until = %(lease_until)s
+             WHERE id IN (
+                    SELECT id
+                      FROM whatsapp_campaign_queue
+                     WHERE campaign_id = %(campaign_id)s
+                       AND status = 'pending'
+                       AND next_attempt_at <= %(now)s
+                       AND (lease_until IS NULL OR lease_until < %(now)s)
+                  ORDER BY next_attempt_at, id
+                     LIMIT %(limit)s
+                       FOR UPDATE SKIP LOCKED
+                   )
+         RETURNING id
+            """,
+            {
+                "campaign_id": self.id,
+                "now": now,
+                "lease_until": now + timedelta(seconds=LEASE_SECONDS),
+                "limit": limit,
+            },
+        )
+        lines = Queue.browse(sorted(row[0] for row in self.env.cr.fetchall()))
+        lines.invalidate_cache(["lease_until"])
+        return lines
+
+    def _has_pending_lines(self):
+        """True while lines remain to be sent, including drip steps scheduled later or leased elsewhere."""
+        self.ensure_one()
+        return bool(
+            self.env["whatsapp.campaign.queue"].search(
+                [("campaign_id", "=", self.id), ("status", "=", "pending")], limit=1
+            )
+        )
+
     def _get_whatsapp_credentials(self):
+        if self.account_id:
+            return self.account_id.token, self.account_id.phone_number_id
         # Reuse sale.order helper to honor per-company whatsapp.account fallback
         return self.env["sale.order"]._get_whatsapp_credentials()
 
-    def _send_line(self, line):
+    def _prepare_line(self, line, credentials):
+        """Validate a queue line and build its Graph request on the main cursor.
+
+        Returns None when the line was failed right away, otherwise a job dict; a job
+        carrying an ``error`` is not sent and goes straight to the retry handling.
+        """
         partner = line.partner_id
-        mobile = (partner.mobile or "").strip()
+        mobile = partner._get_whatsapp_number() or ""
         if not mobile or not MOBILE_PATTERN.match(mobile):
             line.write({"status": "failed", "last_error": _("Invalid mobile number")})
-            return
+            return None
         if hasattr(partner, "whatsapp_opt_in") and not partner.whatsapp_opt_in:
             line.write({"status": "failed", "last_error": _("Partner has not opted in for WhatsApp")})
-            return
-        token, phone_number_id = self._get_whatsapp_credentials()
+            return None
+        client = graph_client.get_client(*credentials)
+        job = {
+            "campaign": self,
+            "line": line,
+            "url": client.messages_url,
+            "headers": client.json_headers,
+            "template_name": "",
+            "breaker": throughput.get_breaker(client.phone_number_id),
+        }
         try:
             mode, template, body, media_url = self._get_line_payload(line)
             if mode == "template":
                 if not template:
                     raise UserError(_("Template is required for template campaigns."))
-                msg_id = self._send_template(mobile, token, phone_number_id, template)
-                summary = template.name or template.template_name or ""
-                self._log_message(msg_id, partner, summary, "template", template.template_name or "")
+                job["payload"] = self._build_template_payload(mobile, template)
+                job["summary"] = template.name or template.template_name or ""
+                job["message_type"] = "template"
+                job["template_name"] = template.template_name or ""
             elif mode == "media_image":
                 if not media_url:
                     raise UserError(_("Image URL is required for media campaigns."))
-                msg_id = self._send_media_image(mobile, token, phone_number_id, media_url, body)
-                summary = body or _("Image")
-                self._log_message(msg_id, partner, summary, "image")
+                job["payload"] = self._build_image_payload(mobile, media_url, body)
+                job["summary"] = body or _("Image")
+                job["message_type"] = "image"
             else:
                 if not body:
                     raise UserError(_("Message body is required for text campaigns."))
-                msg_id = self._send_text(mobile, token, phone_number_id, body)
-                self._log_message(msg_id, partner, body, "text")
-            line.write({"status": "sent", "message_id": msg_id or False, "attempts": line.attempts + 1})
-            self._schedule_next_step(line)
+                job["payload"] = self._build_text_payload(mobile, body)
+                job["summary"] = body
+                job["message_type"] = "text"
+        except Exception as exc:
+            job["error"] = exc
+            job["error_kind"] = graph_client.PERMANENT
+        return job
+
+    def _execute_jobs(self, jobs, concurrency=1):
+        ready = [job for job in jobs if not job.get("error")]
+        workers = min(max(concurrency or 1, 1), MAX_DISPATCH_CONCURRENCY, len(ready))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="whatsapp_campaign") as pool:
+                list(pool.map(self._execute_job, ready))
+        else:
+            for job in ready:
+                self._execute_job(job)
+
+    def _execute_job(self, job):
+        """Perform the HTTP call of a prepared job. May run on a worker thread: no ORM access here."""
+        pacer = job.get("pacer")
+        if pacer and not pacer.acquire():
+            # Paused by a long Retry-After: leave the line for a later run.
+            job["throttled"] = True
+            job["retry_after"] = pacer.pause_remaining()
+            return job
+        breaker = job.get("breaker")
+        if breaker and not breaker.allow():
+            # Graph keeps failing for this number: park the line instead of waiting for another timeout.
+            job["parked"] = True
+            job["retry_after"] = breaker.retry_in()
+            return job
+        started = monotonic()
+        try:
+            response = graph_client.post(job["url"], headers=job["headers"], json=job["payload"])
         except Exception as exc:
-            _logger.warning("Campaign send failed for partner %s: %s", partner.id, exc)
-            attempts = line.attempts + 1
-            backoff_minutes = min(60, 5 * attempts)
-            next_attempt = fields.Datetime.now() + timedelta(minutes=backoff_minutes)
-            status = "failed" if attempts >= 3 else "pending"
-            line.write(
-                {
-                    "status": status,
-                    "last_error": str(exc),
-                    "attempts": attempts,
-                    "next_attempt_at": next_attempt,
-                }
+            job["error"] = exc
+            job["error_kind"] = graph_client.classify_exception(exc)
+            self._record_health(breaker, job["error_kind"])
+            return job
+        job["status_code"] = response.status_code
+        if response.ok:
+            self._record_health(breaker, None)
+            if pacer:
+                pacer.on_success(monotonic() - started)
+            job["msg_id"] = self._extract_message_id(response)
+            return job
+        job["response_text"] = response.text
+        job["error_kind"] = graph_client.classify_response(response)
+        self._record_health(breaker, job["error_kind"])
+        if job["error_kind"] == graph_client.THROTTLED:
+            job["throttled"] = True
+            job["retry_after"] = graph_client.retry_after(response)
+            if pacer and graph_client.error_code(response) not in graph_client.PAIR_RATE_LIMIT_CODES:
+                pacer.on_throttle(job["retry_after"])
+        return job
+
+    @staticmethod
+    def _record_health(breaker, error_kind):
+        """Only transient errors count against the circuit; any answer from the API proves it is reachable."""
+        if not breaker:
+            return
+        if error_kind == graph_client.TRANSIENT:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def _apply_job_result(self, job):
+        line = job["line"]
+        if job.get("throttled"):
+            self._defer_line(line, job.get("retry_after"), job.get("response_text"))
+            return
+        if job.get("parked"):
+            self._defer_line(line, job.get("retry_after"), _("WhatsApp API unavailable, sending paused"))
+            return
+        error = job.get("error")
+        if not error and "response_text" in job:
+            error = UserError(_("WhatsApp API error (%s): %s") % (job["status_code"], job["response_text"]))
+        if error:
+            self._register_line_failure(
+                line, error, permanent=job.get("error_kind") == graph_client.PERMANENT
             )
+            return
+        msg_id = job.get("msg_id")
+        self._log_message(msg_id, line.partner_id, job["summary"], job["message_type"], job["template_name"])
+        line.write({"status": "sent", "message_id": msg_id or False, "attempts": line.attempts + 1})
+        self._schedule_next_step(line)
 
-    def _send_text(self, mobile, token, phone_number_id, message_body):
-        url = f"https://graph.facebook.com/v20.0/{phone_number_id}/messages"
-        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-        payload = {
+    def _defer_line(self, line, retry_after=None, reason=None):
+        """Reschedule a throttled line without spending one of its attempts."""
+        delay = max(retry_after or 0, THROTTLE_RETRY_SECONDS)
+        line.write(
+            {
+                "next_attempt_at": fields.Datetime.now() + timedelta(seconds=delay),
+                "last_error": reason or _("Rate limited by the WhatsApp API"),
+            }
+        )
+
+    def _register_line_failure(self, line, exc, permanent=False):
+        """Retry transient failures with backoff; a permanent error fails the line at once."""
+        _logger.warning("Campaign send failed for partner %s: %s", line.partner_id.id, exc)
+        attempts = line.attempts + 1
+        backoff_minutes = min(60, 5 * attempts)
+        next_attempt = fields.Datetime.now() + timedelta(minutes=backoff_minutes)
+        status = "failed" if permanent or attempts >= 3 else "pending"
+        line.write(
+            {
+                "status": status,
+                "last_error": str(exc),
+                "attempts": attempts,
+                "next_attempt_at": next_attempt,
+            }
+        )
+
+    @staticmethod
+    def _build_text_payload(mobile, message_body):
+        return {
             "messaging_product": "whatsapp",
             "to": mobile,
             "type": "text",
             "text": {"body": message_body},
         }
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        if not response.ok:
-            raise UserError(_("WhatsApp API error (%s): %s") % (response.status_code, response.text))
-        return self._extract_message_id(response)
-
-    def _send_template(self, mobile, token, phone_number_id, template):
-        url = f"https://graph.facebook.com/v20.0/{phone_number_id}/messages"
-        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-        payload = {
+
+    @staticmethod
+    def _build_template_payload(mobile, template):
+        return {
             "messaging_product": "whatsapp",
             "to": mobile,
             "type": "template",
@@ -206,24 +659,15 @@ class WhatsAppCampaign(models.Model):
                 "language": {"code": template.language_code or "en_US"},
             },
         }
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        if not response.ok:
-            raise UserError(_("WhatsApp API error (%s): %s") % (response.status_code, response.text))
-        return self._extract_message_id(response)
-
-    def _send_media_image(self, mobile, token, phone_number_id, media_url, caption=None):
-        url = f"https://graph.facebook.com/v20.0/{phone_number_id}/messages"
-        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-        payload = {
+
+    @staticmethod
+    def _build_image_payload(mobile, media_url, caption=None):
+        return {
             "messaging_product": "whatsapp",
             "to": mobile,
             "type": "image",
             "image": {"link": media_url, "caption": caption or ""},
         }
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
-        if not response.ok:
-            raise UserError(_("WhatsApp API error (%s): %s") % (response.status_code, response.text))
-        return self._extract_message_id(response)
 
     def _extract_message_id(self, response):
         try:
@@ -1,4 +1,5 @@
-from odoo import fields, models
+from odoo import fields, models, tools
+from odoo.tools import sql
 
 
 class WhatsAppCampaignQueue(models.Model):
@@ -15,7 +16,59 @@ class WhatsAppCampaignQueue(models.Model):
         index=True,
     )
     attempts = fields.Integer(default=0)
-    message_id = fields.Char()
+    message_id = fields.Char(index=True)
     last_error = fields.Text()
-    next_attempt_at = fields.Datetime(string="Next Attempt", default=fields.Datetime.now, index=True)
+    next_attempt_at = fields.Datetime(string="Next Attempt", required=True, default=fields.Datetime.now, index=True)
     step_id = fields.Many2one("whatsapp.campaign.step", string="Current Step")
+    lease_until = fields.Datetime(
+        string="Leased Until", readonly=True, help="Set while a dispatcher worker is sending this line."
+    )
+
+    _sql_constraints = [
+        ("campaign_partner_uniq", "unique(campaign_id, partner_id)", "A partner can only be queued once per campaign."),
+    ]
+
+    def _auto_init(self):
+        # Drop duplicate lines left by earlier versions before unique(campaign_id, partner_id) is added;
+        # each partner keeps its most advanced line (sent, then failed, then pending; oldest first).
+        # Once the constraint exists there can be no duplicates, so later updates skip the scan.
+        if sql.table_exists(self.env.cr, self._table) and not sql.constraint_definition(
+            self.env.cr, self._table, "whatsapp_campaign_queue_campaign_partner_uniq"
+        ):
+            self.env.cr.execute(
+                """
+                DELETE FROM whatsapp_campaign_queue
+                 WHERE id IN (
+                        SELECT id
+                          FROM (
+                                SELECT id, first_value(id) OVER (
+                                           PARTITION BY campaign_id, partner_id
+                                           ORDER BY CASE status WHEN 'sent' THEN 0 WHEN 'failed' THEN 1 ELSE 2 END, id
+                                       ) AS keep_id
+                                  FROM whatsapp_campaign_queue
+                               ) AS ranked
+                         WHERE id <> keep_id
+                       )
+                """
+            )
+        # next_attempt_at becomes required: backfill the NULLs from create_date before the ORM
+        # fills them with the current time.
+        if sql.column_exists(self.env.cr, self._table, "next_attempt_at"):
+            self.env.cr.execute(
+                "UPDATE whatsapp_campaign_queue SET next_attempt_at = create_date WHERE next_attempt_at IS NULL"
+            )
+        return super()._auto_init()
+
+    def init(self):
+        # Leases are short-lived, so this partial index stays tiny; it counts the lines in flight per campaign.
+        self._cr.execute(
+            "CREATE INDEX IF NOT EXISTS whatsapp_campaign_queue_leased_idx "
+            "ON whatsapp_campaign_queue (campaign_id) WHERE lease_until IS NOT NULL"
+        )
+        # Serves the due-line claim: equality on campaign/status, then ordered by next attempt.
+        tools.create_index(
+            self._cr,
+            "whatsapp_campaign_queue_due_idx",
+            self._table,
+            ["campaign_id", "status", "next_attempt_at", "id"],
+        )
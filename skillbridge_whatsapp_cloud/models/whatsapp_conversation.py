@@ -1,9 +1,18 @@
+import logging
 import re
+import threading
 
-from odoo import _, fields, models
+from odoo import _, api, fields, models
 from odoo.exceptions import UserError
+from odoo.tools import sql
+
+_logger = logging.getLogger(__name__)
 
 MOBILE_PATTERN = re.compile(r"^\+?[1-9]\d{6,14}$")
+SUMMARY_MODE_PARAM = "skillbridge_whatsapp_cloud.conversation_summary_mode"
+# Set while the conversation rows must be rebuilt after leaving summary mode "view".
+RESYNC_PARAM = "skillbridge_whatsapp_cloud.conversation_resync_pending"
+INBOX_SYNC_CRON = "skillbridge_whatsapp_cloud.ir_cron_whatsapp_inbox_sync"
 
 
 class WhatsAppConversation(models.Model):
@@ -21,6 +30,172 @@ class WhatsAppConversation(models.Model):
     last_message_id = fields.Many2one("whatsapp.message.log", string="Last Message Log", readonly=True)
     message_ids = fields.One2many("whatsapp.message.log", "conversation_id", string="Messages", readonly=True)
 
+    _sql_constraints = [
+        ("partner_uniq", "unique(partner_id)", "A partner has a single WhatsApp conversation."),
+    ]
+
+    def _auto_init(self):
+        # Merge duplicate conversations left by earlier versions before unique(partner_id) is added;
+        # each partner keeps its most recently active conversation.
+        if sql.table_exists(self.env.cr, self._table):
+            self.env.cr.execute(
+                """
+                WITH ranked AS (
+                    SELECT id, first_value(id) OVER (
+                               PARTITION BY partner_id ORDER BY last_message_date DESC NULLS LAST, id DESC
+                           ) AS keep_id
+                      FROM whatsapp_conversation
+                )
+                UPDATE whatsapp_message_log AS log
+                   SET conversation_id = ranked.keep_id
+                  FROM ranked
+                 WHERE log.conversation_id = ranked.id
+                   AND ranked.id <> ranked.keep_id
+                """
+            )
+            self.env.cr.execute(
+                """
+                DELETE FROM whatsapp_conversation
+                 WHERE id IN (
+                        SELECT id
+                          FROM (
+                                SELECT id, first_value(id) OVER (
+                                           PARTITION BY partner_id ORDER BY last_message_date DESC NULLS LAST, id DESC
+                                       ) AS keep_id
+                                  FROM whatsapp_conversation
+                               ) AS ranked
+                         WHERE id <> keep_id
+                       )
+                """
+            )
+        return super()._auto_init()
+
+    @api.model
+    def _backfill_from_logs(self, chunk_size=5000):
+        """Build conversations from existing logs in partner-id chunks, committing after each chunk.
+
+        Per chunk, one ``DISTINCT ON (partner_id)`` query (served by
+        whatsapp_message_log_partner_latest_idx) upserts the conversations with their
+        newest log, and one UPDATE links every log of those partners to its conversation.
+        """
+        auto_commit = not getattr(threading.current_thread(), "testing", False)
+        cr = self.env.cr
+        self.env["whatsapp.message.log"].flush()
+        self.flush()
+        cr.execute("SELECT count(DISTINCT partner_id) FROM whatsapp_message_log WHERE partner_id IS NOT NULL")
+        total = cr.fetchone()[0]
+        done = 0
+        last_partner_id = 0
+        while True:
+            cr.execute(
+                """
+                SELECT max(partner_id), count(*)
+                  FROM (
+                        SELECT DISTINCT partner_id
+                          FROM whatsapp_message_log
+                         WHERE partner_id > %s
+                      ORDER BY partner_id
+                         LIMIT %s
+                       ) AS chunk
+                """,
+                (last_partner_id, chunk_size),
+            )
+            upper_partner_id, partner_count = cr.fetchone()
+            if upper_partner_id is None:
+                break
+            # The summary text mirrors whatsapp.message.log._conversation_summary().
+            cr.execute(
+                """
+                INSERT INTO whatsapp_conversation (
+                    partner_id, last_message_id, last_message_date, last_direction, last_status, last_message,
+                    create_uid, create_date, write_uid, write_date
+                )
+                SELECT DISTINCT ON (log.partner_id)
+                       log.partner_id, log.id, log.create_date, log.direction, log.status,
+                       COALESCE(
+                           NULLIF(log.message_body, ''),
+                           replace(%(template_label)s, '%%s', NULLIF(log.template_name, '')),
+                           '[' || NULLIF(log.message_type, '') || ']',
+                           %(default_label)s
+                       ),
+                       %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+                  FROM whatsapp_message_log AS log
+                 WHERE log.partner_id > %(low)s AND log.partner_id <= %(high)s
+              ORDER BY log.partner_id, log.create_date DESC, log.id DESC
+                ON CONFLICT (partner_id) DO UPDATE
+                   SET last_message_id = EXCLUDED.last_message_id,
+                       last_message_date = EXCLUDED.last_message_date,
+                       last_direction = EXCLUDED.last_direction,
+                       last_status = EXCLUDED.last_status,
+                       last_message = EXCLUDED.last_message
+                """,
+                {
+                    "uid": self.env.uid,
+                    "low": last_partner_id,
+                    "high": upper_partner_id,
+                    "template_label": _("Template: %s"),
+                    "default_label": _("Message"),
+                },
+            )
+            cr.execute(
+                """
+                UPDATE whatsapp_message_log AS log
+                   SET conversation_id = conversation.id
+                  FROM whatsapp_conversation AS conversation
+                 WHERE conversation.partner_id = log.partner_id
+                   AND log.partner_id > %s AND log.partner_id <= %s
+                   AND log.conversation_id IS DISTINCT FROM conversation.id
+                """,
+                (last_partner_id, upper_partner_id),
+            )
+            done += partner_count
+            last_partner_id = upper_partner_id
+            _logger.info("WhatsApp conversation backfill: %s/%s partners", done, total)
+            if auto_commit:
+                cr.commit()
+        self.invalidate_cache()
+        self.env["whatsapp.message.log"].invalidate_cache(["conversation_id"])
+        return done
+
+    @api.model
+    def _uses_summary_view(self):
+        """True when the inbox reads conversation summaries from the summary view instead of these rows."""
+        params = self.env["ir.config_parameter"].sudo()
+        return params.get_param(SUMMARY_MODE_PARAM, "stored") == "view"
+
+    @api.model
+    def _summary_mode_changed(self, previous_mode):
+        """Bring the inbox source of the new summary mode up to date in the background."""
+        if self._uses_summary_view() == (previous_mode == "view"):
+            return
+        if self._uses_summary_view():
+            # The summaries were not kept up to date in "stored" mode: rebuild them all.
+            self.env["whatsapp.conversation.summary"]._mark_all()
+        else:
+            # Logs written in "view" mode skipped these rows: rebuild them from the logs.
+            self.env["ir.config_parameter"].sudo().set_param(RESYNC_PARAM, True)
+        self.env.ref(INBOX_SYNC_CRON)._trigger()
+
+    @api.model
+    def _cron_sync_inbox(self):
+        """Sync the queued summaries in "view" mode; after a switch back to "stored", resync the rows once."""
+        params = self.env["ir.config_parameter"].sudo()
+        if self._uses_summary_view():
+            self.env["whatsapp.conversation.summary"]._sync_pending()
+        elif params.get_param(RESYNC_PARAM):
+            self._backfill_from_logs()
+            params.set_param(RESYNC_PARAM, False)
+        return True
+
+    @api.model
+    def _action_open_inbox(self):
+        xmlid = (
+            "skillbridge_whatsapp_cloud.action_whatsapp_conversation_summary"
+            if self._uses_summary_view()
+            else "skillbridge_whatsapp_cloud.action_whatsapp_conversation"
+        )
+        return self.env["ir.actions.actions"]._for_xml_id(xmlid)
+
     def action_reply(self):
         self.ensure_one()
         return {
@@ -54,7 +229,7 @@ class WhatsAppConversation(models.Model):
 
     @staticmethod
     def _get_partner_mobile(partner):
-        mobile = (partner.mobile or partner.phone or "").strip()
+        mobile = partner._get_whatsapp_number(include_phone=True) or ""
         if not mobile:
             raise UserError(_("The customer mobile number is missing."))
         if not MOBILE_PATTERN.match(mobile):
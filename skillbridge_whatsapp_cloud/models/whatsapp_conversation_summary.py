@@ -0,0 +1,148 @@
+import threading
+
+from odoo import api, fields, models, tools
+
+
+PENDING_TABLE = "whatsapp_conversation_summary_pending"
+
+
+class WhatsAppConversationSummary(models.Model):
+    """Inbox rows built from the newest log of each partner (summary mode "view").
+
+    Message logs do not write these rows: they only queue their partner in
+    ``whatsapp_conversation_summary_pending`` (one ``ON CONFLICT DO NOTHING`` insert per
+    batch), and the inbox sync cron rebuilds the rows of the queued partners alone.
+    """
+
+    _name = "whatsapp.conversation.summary"
+    _description = "WhatsApp Conversation Summary"
+    _auto = False
+    _order = "last_message_date desc, id desc"
+
+    conversation_id = fields.Many2one("whatsapp.conversation", string="Conversation", readonly=True)
+    partner_id = fields.Many2one("res.partner", string="Partner", readonly=True)
+    last_message_id = fields.Many2one("whatsapp.message.log", string="Last Message Log", readonly=True)
+    last_message_date = fields.Datetime(string="Last Message Date", readonly=True)
+    last_direction = fields.Selection(
+        [("outbound", "Outbound"), ("inbound", "Inbound")], string="Last Direction", readonly=True
+    )
+    last_status = fields.Char(string="Last Status", readonly=True)
+    last_message = fields.Text(string="Last Message", compute="_compute_last_message")
+    message_ids = fields.One2many(related="conversation_id.message_ids", string="Messages")
+
+    def init(self):
+        cr = self.env.cr
+        cr.execute("SELECT relkind FROM pg_class WHERE relname = %s", (self._table,))
+        relkind = (cr.fetchone() or [None])[0]
+        if relkind == "m":
+            cr.execute("DROP MATERIALIZED VIEW %s CASCADE" % self._table)
+        elif relkind == "v":
+            # Plain SQL view of earlier versions.
+            tools.drop_view_if_exists(cr, self._table)
+        cr.execute(
+            """
+            CREATE TABLE IF NOT EXISTS whatsapp_conversation_summary (
+                id integer PRIMARY KEY REFERENCES whatsapp_conversation (id) ON DELETE CASCADE,
+                conversation_id integer NOT NULL,
+                partner_id integer NOT NULL,
+                last_message_id integer,
+                last_message_date timestamp,
+                last_direction varchar,
+                last_status varchar
+            )
+            """
+        )
+        cr.execute("CREATE TABLE IF NOT EXISTS %s (partner_id integer PRIMARY KEY)" % PENDING_TABLE)
+        tools.create_index(
+            cr, "whatsapp_conversation_summary_inbox_idx", self._table, ["last_message_date DESC", "id DESC"]
+        )
+        tools.create_index(cr, "whatsapp_conversation_summary_partner_idx", self._table, ["partner_id"])
+        if relkind != "r":
+            # New table: build every row on the next sync.
+            self._mark_all()
+
+    @api.model
+    def _mark_partners(self, partner_ids):
+        """Queue the summaries of ``partner_ids`` for the next sync."""
+        if not partner_ids:
+            return
+        self.env.cr.execute(
+            "INSERT INTO %s (partner_id) SELECT unnest(%%s::int[]) ON CONFLICT DO NOTHING" % PENDING_TABLE,
+            # Sorted so concurrent batches take the keys in the same order.
+            (sorted(set(partner_ids)),),
+        )
+
+    @api.model
+    def _mark_all(self):
+        self.env["whatsapp.conversation"].flush(["partner_id"])
+        self.env.cr.execute(
+            "INSERT INTO %s (partner_id) SELECT partner_id FROM whatsapp_conversation ON CONFLICT DO NOTHING"
+            % PENDING_TABLE
+        )
+
+    @api.model
+    def _sync_pending(self, chunk_size=1000):
+        """Rebuild the summaries of the queued partners in chunks, committing after each chunk.
+
+        Each partner's newest log is one probe of whatsapp_message_log_partner_latest_idx,
+        so a run costs what was written since the previous one, not the size of the inbox.
+        """
+        auto_commit = not getattr(threading.current_thread(), "testing", False)
+        cr = self.env.cr
+        self.env["whatsapp.message.log"].flush(["partner_id", "create_date", "direction", "status"])
+        self.env["whatsapp.conversation"].flush(["partner_id"])
+        done = 0
+        while True:
+            cr.execute(
+                """
+                DELETE FROM {pending}
+                 WHERE partner_id IN (
+                        SELECT partner_id FROM {pending} ORDER BY partner_id LIMIT %s FOR UPDATE SKIP LOCKED
+                       )
+             RETURNING partner_id
+                """.format(pending=PENDING_TABLE),
+                (chunk_size,),
+            )
+            partner_ids = [row[0] for row in cr.fetchall()]
+            if not partner_ids:
+                break
+            cr.execute(
+                """
+                INSERT INTO whatsapp_conversation_summary (
+                    id, conversation_id, partner_id, last_message_id, last_message_date, last_direction, last_status
+                )
+                SELECT conversation.id, conversation.id, conversation.partner_id,
+                       latest.id, latest.create_date, latest.direction, latest.status
+                  FROM whatsapp_conversation AS conversation
+             LEFT JOIN LATERAL (
+                        SELECT log.id, log.create_date, log.direction, log.status
+                          FROM whatsapp_message_log AS log
+                         WHERE log.partner_id = conversation.partner_id
+                      ORDER BY log.create_date DESC, log.id DESC
+                         LIMIT 1
+                       ) AS latest ON TRUE
+                 WHERE conversation.partner_id = ANY(%s)
+                ON CONFLICT (id) DO UPDATE
+                   SET last_message_id = EXCLUDED.last_message_id,
+                       last_message_date = EXCLUDED.last_message_date,
+                       last_direction = EXCLUDED.last_direction,
+                       last_status = EXCLUDED.last_status
+                """,
+                (partner_ids,),
+            )
+            done += len(partner_ids)
+            if auto_commit:
+                cr.commit()
+        self.invalidate_cache()
+        return done
+
+    def _compute_last_message(self):
+        # Logs may have been archived since the last sync: check the whole page in one query.
+        logs = self.mapped("last_message_id").exists()
+        for summary in self:
+            log = summary.last_message_id
+            summary.last_message = log._conversation_summary() if log in logs else False
+
+    def action_reply(self):
+        self.ensure_one()
+        return self.conversation_id.action_reply()
@@ -0,0 +1,70 @@
+import hashlib
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+# Meta keeps uploaded media for 30 days; stop reusing an id a day before it may disappear.
+MEDIA_TTL_DAYS = 29
+
+
+class WhatsAppMediaCache(models.Model):
+    """Media ids returned by the Graph upload endpoint, keyed by sender number and content hash."""
+
+    _name = "whatsapp.media.cache"
+    _description = "WhatsApp Media Cache"
+    _log_access = False
+
+    phone_number_id = fields.Char(string="Phone Number ID", required=True)
+    sha256 = fields.Char(string="Content Hash", required=True)
+    media_id = fields.Char(string="Media ID", required=True)
+    uploaded_at = fields.Datetime(string="Uploaded At", required=True, default=fields.Datetime.now)
+    expires_at = fields.Datetime(string="Expires At", required=True, index=True)
+
+    _sql_constraints = [
+        ("content_uniq", "unique(phone_number_id, sha256)", "This media is already cached for the phone number."),
+    ]
+
+    @staticmethod
+    def _digest(content):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        return hashlib.sha256(content).hexdigest()
+
+    @api.model
+    def _lookup(self, phone_number_id, digest):
+        """Return the cached media id of ``digest`` on ``phone_number_id`` while it is still valid, or False."""
+        self.env.cr.execute(
+            "SELECT media_id FROM whatsapp_media_cache "
+            "WHERE phone_number_id = %s AND sha256 = %s AND expires_at > now() at time zone 'UTC'",
+            (phone_number_id, digest),
+        )
+        row = self.env.cr.fetchone()
+        return row[0] if row else False
+
+    @api.model
+    def _store(self, phone_number_id, digest, media_id):
+        # Upsert: concurrent workers uploading the same document simply keep the latest id.
+        now = fields.Datetime.now()
+        self.env.cr.execute(
+            """
+            INSERT INTO whatsapp_media_cache (phone_number_id, sha256, media_id, uploaded_at, expires_at)
+                 VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (phone_number_id, sha256)
+              DO UPDATE SET media_id = EXCLUDED.media_id,
+                            uploaded_at = EXCLUDED.uploaded_at,
+                            expires_at = EXCLUDED.expires_at
+            """,
+            (phone_number_id, digest, media_id, now, now + timedelta(days=MEDIA_TTL_DAYS)),
+        )
+
+    @api.model
+    def _invalidate(self, phone_number_id, digest):
+        self.env.cr.execute(
+            "DELETE FROM whatsapp_media_cache WHERE phone_number_id = %s AND sha256 = %s",
+            (phone_number_id, digest),
+        )
+
+    @api.model
+    def _cron_prune(self):
+        self.env.cr.execute("DELETE FROM whatsapp_media_cache WHERE expires_at <= now() at time zone 'UTC'")
+        return True
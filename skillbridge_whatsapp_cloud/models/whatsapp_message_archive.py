@@ -0,0 +1,18 @@
+from odoo import fields, models
+
+
+class WhatsAppMessageArchive(models.Model):
+    """Gzipped JSON Lines file holding one chunk of message logs removed by the retention cron."""
+
+    _name = "whatsapp.message.archive"
+    _description = "WhatsApp Message Archive"
+    _order = "date_to desc, id desc"
+
+    name = fields.Char(required=True, readonly=True)
+    date_from = fields.Datetime(string="Oldest Message", readonly=True)
+    date_to = fields.Datetime(string="Newest Message", readonly=True)
+    first_log_id = fields.Integer(string="First Log ID", readonly=True)
+    last_log_id = fields.Integer(string="Last Log ID", readonly=True)
+    log_count = fields.Integer(string="Messages", readonly=True)
+    attachment_id = fields.Many2one("ir.attachment", string="File", readonly=True, ondelete="restrict")
+    datas = fields.Binary(related="attachment_id.datas", string="Archive File")
@@ -0,0 +1,59 @@
+import json
+from datetime import datetime
+
+from odoo import api, fields, models, tools
+
+# Keys already stored in their own columns; the rest of a status callback is kept as compact JSON.
+EVENT_COLUMN_KEYS = ("id", "status", "timestamp", "recipient_id")
+
+
+class WhatsAppMessageEvent(models.Model):
+    """Append-only history of the delivery callbacks received for a message log."""
+
+    _name = "whatsapp.message.event"
+    _description = "WhatsApp Message Status Event"
+    _order = "event_time asc, id asc"
+    _log_access = False
+
+    log_id = fields.Many2one("whatsapp.message.log", string="Message Log", required=True, ondelete="cascade")
+    wamid = fields.Char(string="Message ID", required=True)
+    status = fields.Char(required=True)
+    event_time = fields.Datetime(string="Event Time", required=True)
+    received_at = fields.Datetime(string="Received At", required=True, default=fields.Datetime.now)
+    error_code = fields.Char(string="Error Code")
+    payload = fields.Text(string="Payload")
+
+    def init(self):
+        # The timeline of a log reads its events in order; no other index so inserts stay cheap.
+        tools.create_index(self._cr, "whatsapp_message_event_log_time_idx", self._table, ["log_id", "event_time", "id"])
+
+    @api.model
+    def _event_values(self, log_id, status):
+        """Return the row of one status callback as ``(log_id, wamid, status, event_time, error_code, payload)``."""
+        try:
+            event_time = datetime.utcfromtimestamp(int(status.get("timestamp")))
+        except (TypeError, ValueError, OverflowError):
+            event_time = fields.Datetime.now()
+        errors = status.get("errors") or []
+        error_code = errors[0].get("code") if errors and isinstance(errors, list) and isinstance(errors[0], dict) else None
+        extra = {key: value for key, value in status.items() if key not in EVENT_COLUMN_KEYS}
+        return (
+            log_id,
+            status["id"],
+            status.get("status") or "",
+            event_time,
+            str(error_code) if error_code else None,
+            json.dumps(extra, separators=(",", ":")) if extra else None,
+        )
+
+    @api.model
+    def _record(self, rows):
+        """Append the given event rows with one multi-row INSERT; existing rows are never updated."""
+        if not rows:
+            return
+        self.env.cr.execute(
+            "INSERT INTO whatsapp_message_event (log_id, wamid, status, event_time, error_code, payload, received_at) "
+            "VALUES %s" % ", ".join(["(%s, %s, %s, %s, %s, %s, now() at time zone 'UTC')"] * len(rows)),
+            [value for row in rows for value in row],
+        )
+        self.env["whatsapp.message.log"].browse(list({row[0] for row in rows})).invalidate_cache(["event_ids"])
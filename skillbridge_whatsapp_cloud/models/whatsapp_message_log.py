@@ -1,4 +1,46 @@
-from odoo import _, api, fields, models
+import base64
+import gzip
+import io
+import json
+import logging
+import threading
+from datetime import timedelta
+from time import monotonic
+
+from odoo import _, api, fields, models, tools
+
+_logger = logging.getLogger(__name__)
+
+RETENTION_CRON = "skillbridge_whatsapp_cloud.ir_cron_whatsapp_log_retention"
+PAYLOAD_CURSOR_PARAM = "skillbridge_whatsapp_cloud.payload_retention_cursor"
+RETENTION_CHUNK_SIZE = 5000
+ARCHIVE_CHUNK_SIZE = 20000
+# Stop a retention run after this long and continue in a new cron job.
+RETENTION_TIME_BUDGET = 240
+# Columns written to archive files, in this order.
+ARCHIVE_COLUMNS = (
+    "id", "create_date", "message_id", "partner_id", "order_id", "campaign_id", "direction",
+    "message_type", "template_name", "status", "error_code", "message_body", "last_payload",
+)
+# Status history stored with each archived log (its events are deleted with it).
+ARCHIVE_EVENTS_SQL = """
+    (SELECT coalesce(json_agg(json_build_object(
+                'status', event.status, 'event_time', event.event_time,
+                'error_code', event.error_code, 'payload', event.payload
+            ) ORDER BY event.event_time, event.id), '[]')
+       FROM whatsapp_message_event AS event
+      WHERE event.log_id = whatsapp_message_log.id)
+"""
+
+# Delivery statuses only move forward (sent < delivered < read); failures are terminal.
+STATUS_RANK = {"sent": 1, "delivered": 2, "read": 3}
+TERMINAL_STATUSES = ("failed", "undelivered")
+
+
+def status_rank(status):
+    if status in TERMINAL_STATUSES:
+        return len(STATUS_RANK) + 1
+    return STATUS_RANK.get(status, 0)
 
 
 class WhatsAppMessageLog(models.Model):
@@ -23,6 +65,16 @@ class WhatsAppMessageLog(models.Model):
     status = fields.Char(string="Status", index=True)
     error_code = fields.Char(string="Error Code")
     last_payload = fields.Text(string="Last Payload")
+    event_ids = fields.One2many("whatsapp.message.event", "log_id", string="Status Events", readonly=True)
+
+    def init(self):
+        # Newest log of a partner in one index probe (inbox summary sync, conversation backfill).
+        tools.create_index(
+            self._cr,
+            "whatsapp_message_log_partner_latest_idx",
+            self._table,
+            ["partner_id", "create_date DESC", "id DESC"],
+        )
 
     @api.model_create_multi
     def create(self, vals_list):
@@ -33,9 +85,19 @@ class WhatsAppMessageLog(models.Model):
     def write(self, vals):
         res = super().write(vals)
         if "status" in vals:
-            self._update_conversation_status()
+            if self.env["whatsapp.conversation"]._uses_summary_view():
+                self.env["whatsapp.conversation.summary"]._mark_partners(self.mapped("partner_id").ids)
+            else:
+                self._update_conversation_status()
         return res
 
+    def _accepts_status(self, new_status):
+        """Return True when ``new_status`` moves this log forward; regressions and repeats are no-ops."""
+        self.ensure_one()
+        if not new_status or self.status in TERMINAL_STATUSES:
+            return False
+        return status_rank(new_status) > status_rank(self.status)
+
     def _conversation_summary(self):
         self.ensure_one()
         if self.message_body:
@@ -47,32 +109,209 @@ class WhatsAppMessageLog(models.Model):
         return _("Message")
 
     def _update_conversations(self):
+        """Attach new logs to their partner's conversation and refresh it, set-based for the whole batch.
+
+        Missing conversations are inserted in one statement (``unique(partner_id)`` makes
+        concurrent inserts safe), the logs are linked in a second one and each conversation
+        is written once, with the newest of its logs (in summary mode "view" the partners are
+        only queued for the summary sync).
+        """
+        logs = self.filtered("partner_id")
+        if not logs:
+            return
+        cr = self.env.cr
+        logs.flush(["partner_id", "conversation_id"])
+        now = fields.Datetime.now()
+        cr.execute(
+            """
+            INSERT INTO whatsapp_conversation (partner_id, create_uid, create_date, write_uid, write_date)
+                 SELECT partner_id, %(uid)s, %(now)s, %(uid)s, %(now)s
+                   FROM unnest(%(partner_ids)s::int[]) AS partner_id
+            ON CONFLICT (partner_id) DO NOTHING
+            """,
+            {"uid": self.env.uid, "now": now, "partner_ids": list(set(logs.mapped("partner_id").ids))},
+        )
+        cr.execute(
+            """
+               UPDATE whatsapp_message_log AS log
+                  SET conversation_id = conversation.id
+                 FROM whatsapp_conversation AS conversation
+                WHERE log.id IN %s
+                  AND conversation.partner_id = log.partner_id
+            RETURNING conversation.partner_id, conversation.id
+            """,
+            (tuple(logs.ids),),
+        )
+        conversation_by_partner = dict(cr.fetchall())
+        logs.invalidate_cache(["conversation_id"])
+        if self.env["whatsapp.conversation"]._uses_summary_view():
+            # Leave the conversation rows untouched; the summary sync picks the partners up.
+            self.env["whatsapp.conversation.summary"]._mark_partners(list(conversation_by_partner))
+            return
+        newest_by_partner = {}
+        for log in logs.sorted(lambda rec: (rec.create_date or now, rec.id)):
+            newest_by_partner[log.partner_id.id] = log
         Conversation = self.env["whatsapp.conversation"].sudo()
-        for rec in self:
-            if not rec.partner_id:
-                continue
-            conversation = Conversation.search([("partner_id", "=", rec.partner_id.id)], limit=1)
-            if not conversation:
-                conversation = Conversation.create({"partner_id": rec.partner_id.id})
-            if rec.conversation_id != conversation:
-                rec.write({"conversation_id": conversation.id})
-            conversation.write(
+        for partner_id, log in newest_by_partner.items():
+            Conversation.browse(conversation_by_partner[partner_id]).write(
                 {
-                    "last_message": rec._conversation_summary(),
-                    "last_message_date": rec.create_date or fields.Datetime.now(),
-                    "last_direction": rec.direction,
-                    "last_status": rec.status,
-                    "last_message_id": rec.id,
+                    "last_message": log._conversation_summary(),
+                    "last_message_date": log.create_date or now,
+                    "last_direction": log.direction,
+                    "last_status": log.status,
+                    "last_message_id": log.id,
                 }
             )
-            if rec.conversation_id != conversation:
-                rec.write({"conversation_id": conversation.id})
 
     def _update_conversation_status(self):
-        Conversation = self.env["whatsapp.conversation"].sudo()
-        for rec in self:
-            if not rec.partner_id:
-                continue
-            conversation = Conversation.search([("partner_id", "=", rec.partner_id.id)], limit=1)
-            if conversation and conversation.last_message_id.id == rec.id:
-                conversation.write({"last_status": rec.status})
+        conversations = self.env["whatsapp.conversation"].sudo().search([("last_message_id", "in", self.ids)])
+        for conversation in conversations:
+            conversation.write({"last_status": conversation.last_message_id.status})
+
+    @api.model
+    def _cron_apply_retention(self):
+        """Strip old payloads, then archive and delete logs past the archive age, in committed chunks.
+
+        Each chunk only locks its own rows (``FOR UPDATE SKIP LOCKED`` for the payload
+        strip), so webhook and campaign traffic keeps writing while the table shrinks.
+        """
+        params = self.env["ir.config_parameter"].sudo()
+        payload_days = int(params.get_param("skillbridge_whatsapp_cloud.payload_retention_days", 0) or 0)
+        archive_months = int(params.get_param("skillbridge_whatsapp_cloud.log_archive_months", 0) or 0)
+        auto_commit = not getattr(threading.current_thread(), "testing", False)
+        deadline = monotonic() + RETENTION_TIME_BUDGET
+        self.flush()
+        finished = True
+        if payload_days > 0:
+            cutoff = fields.Datetime.now() - timedelta(days=payload_days)
+            start_id = last_id = int(params.get_param(PAYLOAD_CURSOR_PARAM, 0) or 0)
+            more = True
+            while more:
+                last_id, more = self._strip_payload_chunk(cutoff, last_id)
+                if more and auto_commit:
+                    self.env.cr.commit()
+                if more and monotonic() > deadline:
+                    finished = False
+                    break
+            if last_id != start_id:
+                # Saved once per run: each set_param clears the registry caches of every worker.
+                # An interrupted run only re-scans its (already stripped) range.
+                params.set_param(PAYLOAD_CURSOR_PARAM, last_id)
+        if finished and archive_months > 0:
+            cutoff = fields.Datetime.subtract(fields.Datetime.now(), months=archive_months)
+            while self._archive_chunk(cutoff):
+                if auto_commit:
+                    self.env.cr.commit()
+                if monotonic() > deadline:
+                    finished = False
+                    break
+        self.invalidate_cache()
+        if not finished:
+            self.env.ref(RETENTION_CRON)._trigger()
+        return True
+
+    @api.model
+    def _strip_payload_chunk(self, cutoff, last_id, chunk_size=RETENTION_CHUNK_SIZE):
+        """Clear ``last_payload`` on the id range after ``last_id`` older than ``cutoff``.
+
+        Returns ``(cursor, more)``: the id the next scan starts after, and whether the
+        range was fully processed so the next chunk may follow right away. Walking the
+        primary key from a saved cursor lets each daily run read only the logs that
+        aged since the previous one.
+        """
+        cr = self.env.cr
+        cr.execute(
+            """
+            SELECT max(id), bool_and(create_date < %s)
+              FROM (SELECT id, create_date FROM whatsapp_message_log WHERE id > %s ORDER BY id LIMIT %s) AS chunk
+            """,
+            (cutoff, last_id, chunk_size),
+        )
+        upper_id, all_expired = cr.fetchone()
+        if upper_id is None:
+            return last_id, False
+        cr.execute(
+            """
+            UPDATE whatsapp_message_log
+               SET last_payload = NULL
+             WHERE id IN (
+                    SELECT id
+                      FROM whatsapp_message_log
+                     WHERE id > %s AND id <= %s
+                       AND create_date < %s
+                       AND last_payload IS NOT NULL
+                       FOR UPDATE SKIP LOCKED
+                   )
+            """,
+            (last_id, upper_id, cutoff),
+        )
+        # Rows locked by another transaction were skipped and still hold their payload:
+        # keep the cursor before the first of them so the next run strips them.
+        cr.execute(
+            """
+            SELECT min(id)
+              FROM whatsapp_message_log
+             WHERE id > %s AND id <= %s
+               AND create_date < %s
+               AND last_payload IS NOT NULL
+            """,
+            (last_id, upper_id, cutoff),
+        )
+        first_skipped_id = cr.fetchone()[0]
+        if first_skipped_id is not None:
+            return first_skipped_id - 1, False
+        if not all_expired:
+            # Reached logs younger than the cutoff: resume from here on the next run.
+            return last_id, False
+        return upper_id, True
+
+    @api.model
+    def _archive_chunk(self, cutoff, chunk_size=ARCHIVE_CHUNK_SIZE):
+        """Move the oldest logs created before ``cutoff`` into one gzipped JSONL archive; False when none left."""
+        cr = self.env.cr
+        cr.execute(
+            "SELECT %s, %s FROM whatsapp_message_log WHERE create_date < %%s ORDER BY id LIMIT %%s"
+            % (", ".join(ARCHIVE_COLUMNS), ARCHIVE_EVENTS_SQL),
+            (cutoff, chunk_size),
+        )
+        buffer = io.BytesIO()
+        log_ids = []
+        date_from = date_to = None
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as archive:
+            while True:
+                rows = cr.fetchmany(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    record = dict(zip(ARCHIVE_COLUMNS + ("events",), row))
+                    log_ids.append(record["id"])
+                    created = record["create_date"]
+                    date_from = min(date_from, created) if date_from else created
+                    date_to = max(date_to, created) if date_to else created
+                    archive.write(json.dumps(record, default=str).encode("utf-8") + b"\n")
+        if not log_ids:
+            return False
+        name = "whatsapp_messages_%s_%s.jsonl.gz" % (log_ids[0], log_ids[-1])
+        attachment = self.env["ir.attachment"].sudo().create(
+            {
+                "name": name,
+                "datas": base64.b64encode(buffer.getvalue()),
+                "mimetype": "application/gzip",
+                "res_model": "whatsapp.message.archive",
+            }
+        )
+        archive_record = self.env["whatsapp.message.archive"].sudo().create(
+            {
+                "name": name,
+                "date_from": date_from,
+                "date_to": date_to,
+                "first_log_id": log_ids[0],
+                "last_log_id": log_ids[-1],
+                "log_count": len(log_ids),
+                "attachment_id": attachment.id,
+            }
+        )
+        attachment.res_id = archive_record.id
+        cr.execute("DELETE FROM whatsapp_message_log WHERE id = ANY(%s)", (log_ids,))
+        _logger.info("WhatsApp log retention: archived %s logs into %s", len(log_ids), name)
+        return True
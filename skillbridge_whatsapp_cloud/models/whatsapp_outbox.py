@@ -0,0 +1,146 @@
+import logging
+import threading
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+from ..tools import graph_client
+
+_logger = logging.getLogger(__name__)
+
+OUTBOX_CRON = "skillbridge_whatsapp_cloud.ir_cron_whatsapp_outbox"
+MAX_ATTEMPTS = 3
+THROTTLE_RETRY_SECONDS = 60
+
+
+class WhatsAppOutbox(models.Model):
+    """Send requests enqueued by order confirmation/invoice posting and dispatched after commit."""
+
+    _name = "whatsapp.outbox"
+    _description = "WhatsApp Outbox"
+    _order = "id asc"
+
+    order_id = fields.Many2one("sale.order", string="Sales Order", required=True, index=True, ondelete="cascade")
+    partner_id = fields.Many2one(related="order_id.partner_id", string="Partner")
+    trigger = fields.Selection(
+        [("order_confirm", "Order Confirmation"), ("invoice_post", "Invoice Post")],
+        required=True,
+    )
+    include_sale_order_pdf = fields.Boolean(string="Attach Sales Order PDF", default=True)
+    include_invoice_pdf = fields.Boolean(string="Attach Posted Invoices", default=False)
+    state = fields.Selection(
+        [("pending", "Pending"), ("done", "Sent"), ("failed", "Failed")],
+        default="pending",
+        required=True,
+        index=True,
+    )
+    attempts = fields.Integer(default=0, readonly=True)
+    sent_parts = fields.Integer(
+        string="Parts Sent", default=0, readonly=True, help="Messages and documents already delivered; retries resume after them."
+    )
+    last_error = fields.Text(readonly=True)
+    next_attempt_at = fields.Datetime(string="Next Attempt", default=fields.Datetime.now, index=True)
+    processed_at = fields.Datetime(string="Processed At", readonly=True)
+
+    @api.model
+    def _enqueue(self, orders, trigger, include_sale_order_pdf=True, include_invoice_pdf=False):
+        """Record one send request per order in the caller's transaction and wake the dispatcher."""
+        records = self.create(
+            [
+                {
+                    "order_id": order.id,
+                    "trigger": trigger,
+                    "include_sale_order_pdf": include_sale_order_pdf,
+                    "include_invoice_pdf": include_invoice_pdf,
+                }
+                for order in orders
+            ]
+        )
+        cron = self.env.ref(OUTBOX_CRON, raise_if_not_found=False)
+        if records and cron:
+            # The trigger row commits with the caller, so the dispatcher only sees committed requests.
+            cron._trigger()
+        return records
+
+    def action_retry(self):
+        self.write({"state": "pending", "next_attempt_at": fields.Datetime.now(), "last_error": False})
+        cron = self.env.ref(OUTBOX_CRON, raise_if_not_found=False)
+        if cron:
+            cron._trigger()
+        return True
+
+    @api.model
+    def _cron_dispatch(self, limit=None):
+        params = self.env["ir.config_parameter"].sudo()
+        batch_limit = limit or int(params.get_param("skillbridge_whatsapp_cloud.outbox_batch_size", 50))
+        records = self.search(
+            [("state", "=", "pending"), ("next_attempt_at", "<=", fields.Datetime.now())],
+            order="id asc",
+            limit=batch_limit,
+        )
+        auto_commit = not getattr(threading.current_thread(), "testing", False)
+        for record in records:
+            record._dispatch()
+            if auto_commit:
+                # Commit per request: messages already sent must not be resent if a later one crashes the run.
+                self.env.cr.commit()
+        if len(records) == batch_limit:
+            self.env.ref(OUTBOX_CRON)._trigger()
+        return True
+
+    def _dispatch(self):
+        self.ensure_one()
+        order = self.order_id.with_company(self.order_id.company_id)
+        try:
+            with self.env.cr.savepoint():
+                sent_parts, log_vals, error = order._send_whatsapp_parts(
+                    message_body=order._get_default_whatsapp_message(),
+                    message_mode="text",
+                    include_sale_order_pdf=self.include_sale_order_pdf,
+                    include_invoice_pdf=self.include_invoice_pdf,
+                    skip_parts=self.sent_parts,
+                )
+        except Exception as exc:
+            self._register_failure(exc)
+            return False
+        # Logs and progress of the parts delivered are kept even when a later part failed,
+        # so a retry resumes after them instead of sending them again.
+        self.env["whatsapp.message.log"].sudo().create(log_vals)
+        if sent_parts:
+            self.sent_parts += sent_parts
+        if error:
+            try:
+                order._raise_whatsapp_error(error)
+            except Exception as exc:
+                self._register_failure(exc)
+            return False
+        self.write(
+            {"state": "done", "attempts": self.attempts + 1, "processed_at": fields.Datetime.now(), "last_error": False}
+        )
+        return True
+
+    def _register_failure(self, exc):
+        """Apply the retry policy of the error class behind ``exc``.
+
+        Throttling waits for the API without spending an attempt, transient errors are
+        retried with backoff and permanent ones (bad number, rejected template, missing
+        data) fail right away.
+        """
+        cause = exc.__cause__ if isinstance(exc.__cause__, graph_client.GraphAPIError) else exc
+        kind = graph_client.classify_exception(cause)
+        if kind == graph_client.THROTTLED:
+            delay = max(getattr(cause, "retry_after", None) or 0, THROTTLE_RETRY_SECONDS)
+            self.write({"last_error": str(exc), "next_attempt_at": fields.Datetime.now() + timedelta(seconds=delay)})
+            return
+        attempts = self.attempts + 1
+        _logger.warning(
+            "WhatsApp outbox send failed for %s (attempt %s, %s): %s", self.order_id.name, attempts, kind, exc
+        )
+        self.write(
+            {
+                "state": "failed" if kind == graph_client.PERMANENT or attempts >= MAX_ATTEMPTS else "pending",
+                "attempts": attempts,
+                "last_error": str(exc),
+                "next_attempt_at": fields.Datetime.now() + timedelta(minutes=min(60, 5 * attempts)),
+            }
+        )
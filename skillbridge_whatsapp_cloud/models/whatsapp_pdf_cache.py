@@ -0,0 +1,67 @@
+import base64
+from datetime import timedelta
+
+import psycopg2
+
+from odoo import api, fields, models
+
+PDF_CACHE_TTL_DAYS = 30
+
+
+class WhatsAppPdfCache(models.Model):
+    """Report PDFs rendered for WhatsApp sends, reused while the record is unchanged."""
+
+    _name = "whatsapp.pdf.cache"
+    _description = "WhatsApp PDF Cache"
+    _log_access = False
+
+    report_id = fields.Many2one("ir.actions.report", required=True, ondelete="cascade")
+    res_model = fields.Char(string="Model", required=True)
+    res_id = fields.Integer(string="Record ID", required=True)
+    record_write_date = fields.Datetime(string="Record Last Update", required=True)
+    datas = fields.Binary(string="PDF", attachment=True)
+    rendered_at = fields.Datetime(string="Rendered At", default=fields.Datetime.now, index=True)
+
+    _sql_constraints = [
+        ("record_uniq", "unique(report_id, res_model, res_id)", "A PDF is already cached for this record."),
+    ]
+
+    @api.model
+    def _get_pdf(self, report, record):
+        """Return the PDF of ``report`` for ``record``, running wkhtmltopdf only when needed.
+
+        A report attachment Odoo already saved (e.g. the PDF of a posted invoice) wins;
+        otherwise the cached rendering is used as long as the record's write_date matches.
+        """
+        record.ensure_one()
+        if report.attachment:
+            attachment = report.retrieve_attachment(record)
+            if attachment:
+                return attachment.raw
+        entry = self.search(
+            [("report_id", "=", report.id), ("res_model", "=", record._name), ("res_id", "=", record.id)], limit=1
+        )
+        if entry and entry.datas and entry.record_write_date == record.write_date:
+            return base64.b64decode(entry.datas)
+        pdf_content, _report_format = report._render_qweb_pdf(record.id)
+        vals = {
+            "record_write_date": record.write_date,
+            "datas": base64.b64encode(pdf_content),
+            "rendered_at": fields.Datetime.now(),
+        }
+        if entry:
+            entry.write(vals)
+        else:
+            try:
+                with self.env.cr.savepoint():
+                    self.create(dict(vals, report_id=report.id, res_model=record._name, res_id=record.id))
+            except psycopg2.IntegrityError:
+                # Rendered concurrently by another worker; its copy is as good as ours.
+                pass
+        return pdf_content
+
+    @api.model
+    def _cron_prune(self):
+        cutoff = fields.Datetime.now() - timedelta(days=PDF_CACHE_TTL_DAYS)
+        self.search([("rendered_at", "<", cutoff)]).unlink()
+        return True
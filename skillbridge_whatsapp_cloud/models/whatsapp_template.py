@@ -1,11 +1,11 @@
 import logging
 import re
 
-import requests
-
 from odoo import _, fields, models
 from odoo.exceptions import UserError
 
+from ..tools import graph_client
+
 _logger = logging.getLogger(__name__)
 
 
@@ -76,7 +76,7 @@ class WhatsAppTemplate(models.Model):
 
     def _sync_from_meta(self):
         token, business_account_id = self._get_sync_credentials()
-        url = f"https://graph.facebook.com/v20.0/{business_account_id}/message_templates"
+        url = graph_client.graph_url(business_account_id, "message_templates")
         params = {
             "fields": "id,name,language,category,status,components,quality_score",
             "limit": 200,
@@ -85,7 +85,7 @@ class WhatsAppTemplate(models.Model):
         total_updated = 0
         headers = {"Authorization": f"Bearer {token}"}
         while url:
-            response = requests.get(url, headers=headers, params=params, timeout=20)
+            response = graph_client.get(url, headers=headers, params=params)
             if not response.ok:
                 raise UserError(_("Template sync failed (%s): %s") % (response.status_code, response.text))
             payload = response.json()
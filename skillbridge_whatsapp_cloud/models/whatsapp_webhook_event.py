@@ -0,0 +1,115 @@
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from odoo import _, api, fields, models
+
+from ..controllers import whatsapp_webhook
+
+_logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+EVENTS_CRON = "skillbridge_whatsapp_cloud.ir_cron_whatsapp_webhook_events"
+
+
+class WhatsAppWebhookEvent(models.Model):
+    """Raw webhook callbacks staged by the ingest endpoint and drained oldest first by a cron.
+
+    Ordering is best effort: a failed event is retried later while the events after
+    it are applied, as Meta itself does not guarantee callback order. Status updates
+    stay consistent because a log's status only moves forward; inbound messages
+    retried this way are logged after newer ones.
+    """
+
+    _name = "whatsapp.webhook.event"
+    _description = "WhatsApp Webhook Event"
+    _order = "id asc"
+
+    payload = fields.Text(string="Raw Payload", required=True, readonly=True)
+    state = fields.Selection(
+        [("pending", "Pending"), ("done", "Done"), ("failed", "Failed")],
+        default="pending",
+        required=True,
+        index=True,
+    )
+    attempts = fields.Integer(default=0, readonly=True)
+    last_error = fields.Text(readonly=True)
+    next_attempt_at = fields.Datetime(string="Next Attempt", default=fields.Datetime.now, index=True)
+    processed_at = fields.Datetime(string="Processed At", readonly=True)
+
+    @api.model
+    def _enqueue(self, body_text):
+        event = self.create({"payload": body_text})
+        self._trigger_processing()
+        return event
+
+    @api.model
+    def _trigger_processing(self):
+        """Wake the queue cron, unless a trigger is already waiting (one row per callback floods ir_cron_trigger)."""
+        cron = self.env.ref(EVENTS_CRON, raise_if_not_found=False)
+        if not cron:
+            return
+        self.env.cr.execute(
+            "SELECT 1 FROM ir_cron_trigger WHERE cron_id = %s AND call_at <= now() at time zone 'UTC' LIMIT 1",
+            (cron.id,),
+        )
+        if not self.env.cr.fetchone():
+            cron._trigger()
+
+    def action_retry(self):
+        self.write({"state": "pending", "next_attempt_at": fields.Datetime.now(), "last_error": False})
+        return True
+
+    @api.model
+    def _cron_process_events(self, limit=None):
+        """Drain pending events oldest first; failures are retried with backoff without blocking later events."""
+        params = self.env["ir.config_parameter"].sudo()
+        batch_limit = limit or int(params.get_param("skillbridge_whatsapp_cloud.webhook_batch_size", 200))
+        events = self.search(
+            [("state", "=", "pending"), ("next_attempt_at", "<=", fields.Datetime.now())],
+            order="id asc",
+            limit=batch_limit,
+        )
+        auto_commit = not getattr(threading.current_thread(), "testing", False)
+        controller = whatsapp_webhook.WhatsAppWebhookController()
+        for event in events:
+            event._process(controller)
+            if auto_commit:
+                self.env.cr.commit()
+        # Events enqueued while this run was busy found its trigger still pending and did not add one:
+        # run again right away when anything is due instead of waiting for the next interval.
+        if self.search_count([("state", "=", "pending"), ("next_attempt_at", "<=", fields.Datetime.now())]):
+            self.env.ref(EVENTS_CRON)._trigger()
+        self._gc_processed_events()
+        return True
+
+    def _process(self, controller):
+        self.ensure_one()
+        try:
+            payload = json.loads(self.payload)
+        except ValueError:
+            _logger.warning("Discarding WhatsApp webhook event %s: invalid JSON.", self.id)
+            self.write({"state": "failed", "last_error": _("Invalid JSON payload"), "attempts": self.attempts + 1})
+            return
+        try:
+            with self.env.cr.savepoint():
+                controller._process_payload(payload, env=self.env)
+        except Exception as exc:
+            attempts = self.attempts + 1
+            _logger.warning("WhatsApp webhook event %s failed (attempt %s): %s", self.id, attempts, exc)
+            self.write(
+                {
+                    "state": "failed" if attempts >= MAX_ATTEMPTS else "pending",
+                    "attempts": attempts,
+                    "last_error": str(exc),
+                    "next_attempt_at": fields.Datetime.now() + timedelta(minutes=min(60, 2**attempts)),
+                }
+            )
+            return
+        self.write({"state": "done", "processed_at": fields.Datetime.now(), "last_error": False})
+
+    @api.model
+    def _gc_processed_events(self, days=7):
+        cutoff = fields.Datetime.now() - timedelta(days=days)
+        self.search([("state", "=", "done"), ("processed_at", "<", cutoff)], limit=5000).unlink()
@@ -0,0 +1,53 @@
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class WhatsAppWebhookSeen(models.Model):
+    """Compact record of webhook events already applied, used to drop Meta retries."""
+
+    _name = "whatsapp.webhook.seen"
+    _description = "WhatsApp Webhook Seen Event"
+    _log_access = False
+
+    wamid = fields.Char(string="Message ID", required=True)
+    kind = fields.Selection([("message", "Message"), ("status", "Status")], required=True)
+    status = fields.Char(required=True, default="")
+    seen_at = fields.Datetime(string="Seen At", required=True, default=fields.Datetime.now, index=True)
+
+    _sql_constraints = [
+        ("event_uniq", "unique(wamid, kind, status)", "This webhook event has already been recorded."),
+    ]
+
+    @api.model
+    def _claim(self, keys):
+        """Record ``(wamid, kind, status)`` keys and return the subset that was not seen before."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return set()
+        self.env.cr.execute(
+            "INSERT INTO whatsapp_webhook_seen (wamid, kind, status, seen_at) VALUES %s "
+            "ON CONFLICT (wamid, kind, status) DO NOTHING RETURNING wamid, kind, status"
+            % ", ".join(["(%s, %s, %s, now() at time zone 'UTC')"] * len(keys)),
+            [value for key in keys for value in key],
+        )
+        return set(self.env.cr.fetchall())
+
+    @api.model
+    def _cron_prune(self, chunk_size=50000):
+        ttl_days = int(
+            self.env["ir.config_parameter"].sudo().get_param("skillbridge_whatsapp_cloud.webhook_dedup_ttl_days", 7)
+        )
+        cutoff = fields.Datetime.now() - timedelta(days=ttl_days)
+        while True:
+            self.env.cr.execute(
+                "DELETE FROM whatsapp_webhook_seen WHERE id IN "
+                "(SELECT id FROM whatsapp_webhook_seen WHERE seen_at < %s LIMIT %s)",
+                (cutoff, chunk_size),
+            )
+            if self.env.cr.rowcount < chunk_size:
+                break
+        return True
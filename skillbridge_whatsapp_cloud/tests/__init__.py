@@ -1 +1,16 @@
 # tests package
+from . import test_account_resolver
+from . import test_campaign_dispatch
+from . import test_campaign_queue
+from . import test_conversation_upsert
+from . import test_document_pipeline
+from . import test_log_retention
+from . import test_media_cache
+from . import test_outbox
+from . import test_partner_phone_lookup
+from . import test_pdf_cache
+from . import test_settings_validation
+from . import test_throughput
+from . import test_webhook_event_queue
+from . import test_webhook_processing
+from . import test_webhook_signature
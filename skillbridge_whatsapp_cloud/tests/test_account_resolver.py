@@ -0,0 +1,38 @@
+from odoo.tests import TransactionCase
+
+from ..tools import graph_client
+
+
+class TestAccountResolver(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        params = self.env["ir.config_parameter"].sudo()
+        params.set_param("skillbridge_whatsapp_cloud.token", "settings-token")
+        params.set_param("skillbridge_whatsapp_cloud.phone_number_id", "111")
+        self.Account = self.env["whatsapp.account"]
+        self.Account.search([("company_id", "=", self.env.company.id)]).write({"is_default": False})
+
+    def test_resolver_follows_account_changes(self):
+        self.assertEqual(self.env["sale.order"]._get_whatsapp_credentials(), ("settings-token", "111"))
+        account = self.Account.create(
+            {
+                "name": "Default",
+                "company_id": self.env.company.id,
+                "phone_number_id": "222",
+                "token": "account-token",
+                "is_default": True,
+            }
+        )
+        self.assertEqual(self.env["sale.order"]._get_whatsapp_credentials(), ("account-token", "222"))
+        self.assertEqual(self.Account._get_company_account(), account)
+        client = graph_client.get_client(*self.env["sale.order"]._get_whatsapp_credentials())
+        account.write({"phone_number_id": "333"})
+        self.assertEqual(self.env["sale.order"]._get_whatsapp_credentials(), ("account-token", "333"))
+        self.assertNotIn(client, graph_client._clients.values(), "Account changes drop the cached clients")
+
+    def test_client_cache_is_bounded(self):
+        first = graph_client.get_client("token-0", "0")
+        for idx in range(1, graph_client.MAX_CLIENTS + 1):
+            graph_client.get_client(f"token-{idx}", str(idx))
+        self.assertLessEqual(len(graph_client._clients), graph_client.MAX_CLIENTS)
+        self.assertNotIn(first, graph_client._clients.values())
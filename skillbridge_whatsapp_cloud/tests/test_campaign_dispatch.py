@@ -0,0 +1,129 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import TransactionCase
+
+from ..tools import graph_client, throughput
+
+
+class FakeResponse:
+    def __init__(self, msg_id, status_code=200, error_code=None, headers=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = "" if self.ok else '{"error": {"message": "boom"}}'
+        self.headers = headers or {}
+        self._msg_id = msg_id
+        self._error_code = error_code
+
+    def json(self):
+        if not self.ok:
+            return {"error": {"message": "boom", "code": self._error_code}}
+        return {"messages": [{"id": self._msg_id}]}
+
+
+class TestCampaignDispatch(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        params = self.env["ir.config_parameter"].sudo()
+        params.set_param("skillbridge_whatsapp_cloud.token", "token")
+        params.set_param("skillbridge_whatsapp_cloud.phone_number_id", "1234567890")
+        self.partners = self.env["res.partner"].create(
+            [
+                {"name": f"Campaign Partner {idx}", "mobile": f"+1555000{idx:04d}", "whatsapp_opt_in": True}
+                for idx in range(5)
+            ]
+        )
+        self.campaign = self.env["whatsapp.campaign"].create(
+            {"name": "Concurrent", "message_body": "Hello", "dispatch_concurrency": 4}
+        )
+        self.env["whatsapp.campaign.queue"].create(
+            [{"campaign_id": self.campaign.id, "partner_id": partner.id} for partner in self.partners]
+        )
+        # Pacers and breakers live for the whole process; start every test from a fresh sender state.
+        for registry in (throughput._pacers, throughput._breakers):
+            registry.pop("1234567890", None)
+            self.addCleanup(registry.pop, "1234567890", None)
+
+    def _dispatch(self):
+        self.campaign.action_start()
+        return self.env["whatsapp.campaign"]._dispatch_due_lines()
+
+    def _fake_post(self, url, **kwargs):
+        return FakeResponse("wamid.%s" % kwargs["json"]["to"])
+
+    def test_concurrent_batch_sends_every_line(self):
+        with patch.object(graph_client, "post", side_effect=self._fake_post):
+            self.assertEqual(self._dispatch(), 5)
+        self.assertEqual(set(self.campaign.queue_ids.mapped("status")), {"sent"})
+        self.assertFalse(any(self.campaign.queue_ids.mapped("lease_until")))
+        logs = self.env["whatsapp.message.log"].search([("campaign_id", "=", self.campaign.id)])
+        self.assertEqual(len(logs), 5)
+        self.assertEqual(set(logs.mapped("message_id")), set(self.campaign.queue_ids.mapped("message_id")))
+
+    def test_throttled_lines_are_deferred_without_spending_an_attempt(self):
+        lines = self.campaign.queue_ids
+        throttled = FakeResponse(None, status_code=429, error_code=130429, headers={"Retry-After": "120"})
+        with patch.object(graph_client, "post", return_value=throttled):
+            self._dispatch()
+        self.assertEqual(set(lines.mapped("status")), {"pending"})
+        self.assertEqual(set(lines.mapped("attempts")), {0})
+        for line in lines:
+            self.assertGreaterEqual((line.next_attempt_at - fields.Datetime.now()).total_seconds(), 110)
+        self.assertGreater(throughput._pacers["1234567890"].pause_remaining(), 110)
+
+        # While the Retry-After pause lasts, the next run sends nothing.
+        lines.write({"next_attempt_at": fields.Datetime.now()})
+        with patch.object(graph_client, "post", side_effect=self._fake_post) as post:
+            self.env["whatsapp.campaign"]._dispatch_due_lines()
+        post.assert_not_called()
+
+    def test_permanent_error_fails_line_without_retry(self):
+        rejected = FakeResponse(None, status_code=400, error_code=131026)
+        with patch.object(graph_client, "post", return_value=rejected):
+            self._dispatch()
+        self.assertEqual(set(self.campaign.queue_ids.mapped("status")), {"failed"})
+        self.assertEqual(set(self.campaign.queue_ids.mapped("attempts")), {1})
+
+    def test_open_circuit_parks_the_sender(self):
+        breaker = throughput.get_breaker("1234567890")
+        for _attempt in range(throughput.BREAKER_THRESHOLD):
+            breaker.record_failure()
+        with patch.object(graph_client, "post", side_effect=self._fake_post) as post:
+            self.assertEqual(self._dispatch(), 0)
+        post.assert_not_called()
+        self.assertEqual(set(self.campaign.queue_ids.mapped("status")), {"pending"})
+
+    def test_continuous_dispatch_waits_for_next_run(self):
+        self.env["ir.config_parameter"].sudo().set_param(
+            "skillbridge_whatsapp_cloud.campaign_continuous_dispatch", "True"
+        )
+        start_at = fields.Datetime.now() + timedelta(hours=2)
+        self.campaign.write({"next_run": start_at})
+        self.campaign.action_start()
+        self.assertEqual(self.campaign.next_run, start_at)
+        with patch.object(graph_client, "post", side_effect=self._fake_post) as post:
+            self.env["whatsapp.campaign"]._cron_dispatch_continuous()
+        post.assert_not_called()
+        self.assertEqual(self.env["whatsapp.campaign"]._next_dispatch_at(), start_at)
+
+    def test_kpi_totals(self):
+        lines = self.campaign.queue_ids
+        lines[:2].write({"status": "sent"})
+        lines[2:3].write({"status": "failed"})
+        Log = self.env["whatsapp.message.log"]
+        for idx, status in enumerate(["delivered", "read", "read"]):
+            Log.create(
+                {
+                    "message_id": f"wamid.kpi{idx}",
+                    "campaign_id": self.campaign.id,
+                    "partner_id": self.partners[idx].id,
+                    "status": status,
+                }
+            )
+        self.campaign.invalidate_cache()
+        self.assertEqual(self.campaign.total_pending, 2)
+        self.assertEqual(self.campaign.total_sent, 2)
+        self.assertEqual(self.campaign.total_failed, 1)
+        self.assertEqual(self.campaign.total_delivered, 1)
+        self.assertEqual(self.campaign.total_read, 2)
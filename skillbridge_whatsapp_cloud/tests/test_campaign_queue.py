@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase
+
+from ..tools import graph_client, throughput
+
+
+class TestCampaignQueueGeneration(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        self.tag = self.env["res.partner.category"].create({"name": "WhatsApp Audience"})
+        self.partners = self.env["res.partner"].create(
+            [
+                {"name": f"Audience {idx}", "mobile": f"+1555200{idx:04d}", "category_id": [(6, 0, self.tag.ids)]}
+                for idx in range(3)
+            ]
+        )
+        self.campaign = self.env["whatsapp.campaign"].create(
+            {"name": "Audience", "message_body": "Hello", "partner_tag_ids": [(6, 0, self.tag.ids)]}
+        )
+        self.step = self.env["whatsapp.campaign.step"].create(
+            {"campaign_id": self.campaign.id, "sequence": 1, "message_body": "Step 1"}
+        )
+
+    def test_generation_is_idempotent(self):
+        self.campaign.action_generate_queue()
+        self.campaign.action_generate_queue()
+        lines = self.env["whatsapp.campaign.queue"].search([("campaign_id", "=", self.campaign.id)])
+        self.assertEqual(lines.partner_id, self.partners)
+        self.assertEqual(set(lines.mapped("step_id").ids), {self.step.id})
+        self.assertEqual(self.campaign.queue_generation_state, "done")
+        self.assertEqual(self.campaign.queue_generated_count, 0, "The second run must not add lines")
+
+    def test_background_generation_reports_progress(self):
+        self.campaign.action_generate_queue_background()
+        self.assertEqual(self.campaign.queue_generation_state, "queued")
+        self.assertEqual(self.campaign.queue_generation_total, 3)
+        self.env["whatsapp.campaign"]._cron_generate_queues()
+        self.assertEqual(self.campaign.queue_generation_state, "done")
+        self.assertEqual(self.campaign.queue_generated_count, 3)
+        self.assertEqual(self.campaign.queue_generation_progress, 100.0)
+
+    def test_campaign_started_before_background_generation_waits_for_lines(self):
+        params = self.env["ir.config_parameter"].sudo()
+        params.set_param("skillbridge_whatsapp_cloud.token", "token")
+        params.set_param("skillbridge_whatsapp_cloud.phone_number_id", "99887766")
+        for registry in (throughput._pacers, throughput._breakers):
+            registry.pop("99887766", None)
+            self.addCleanup(registry.pop, "99887766", None)
+        self.partners.write({"whatsapp_opt_in": True})
+        self.campaign.action_generate_queue_background()
+        self.campaign.action_start()
+
+        class Sent:
+            ok = True
+            status_code = 200
+            headers = {}
+            text = ""
+
+            def json(self):
+                return {"messages": [{"id": "wamid.generated"}]}
+
+        with patch.object(graph_client, "post", return_value=Sent()):
+            self.env["whatsapp.campaign"]._dispatch_due_lines()
+            self.assertEqual(self.campaign.state, "running", "No lines yet: generation is still queued")
+
+            self.env["whatsapp.campaign"]._cron_generate_queues()
+            self.env["whatsapp.campaign"]._dispatch_due_lines()
+        self.assertEqual(set(self.campaign.queue_ids.mapped("status")), {"sent"})
@@ -0,0 +1,111 @@
+from odoo.tests import TransactionCase
+
+
+class TestConversationUpsert(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        self.partners = self.env["res.partner"].create([{"name": "Conv A"}, {"name": "Conv B"}])
+        self.Log = self.env["whatsapp.message.log"]
+        self.Conversation = self.env["whatsapp.conversation"]
+
+    def _vals(self, partner, idx):
+        return {
+            "message_id": f"wamid.conv{partner.id}-{idx}",
+            "partner_id": partner.id,
+            "direction": "outbound",
+            "status": "sent",
+            "message_body": f"Message {idx}",
+        }
+
+    def test_batch_creates_one_conversation_per_partner(self):
+        partner_a, partner_b = self.partners
+        logs = self.Log.create([self._vals(partner_a, 1), self._vals(partner_b, 1), self._vals(partner_a, 2)])
+        conversations = self.Conversation.search([("partner_id", "in", self.partners.ids)])
+        self.assertEqual(len(conversations), 2)
+        conversation_a = conversations.filtered(lambda conv: conv.partner_id == partner_a)
+        self.assertEqual(logs[0].conversation_id, conversation_a)
+        self.assertEqual(logs[2].conversation_id, conversation_a)
+        self.assertEqual(conversation_a.last_message_id, logs[2])
+        self.assertEqual(conversation_a.last_message, "Message 2")
+
+        later = self.Log.create(self._vals(partner_a, 3))
+        self.assertEqual(later.conversation_id, conversation_a)
+        self.assertEqual(self.Conversation.search_count([("partner_id", "=", partner_a.id)]), 1)
+
+    def test_summary_view_mode_leaves_conversation_rows_alone(self):
+        self.env["ir.config_parameter"].sudo().set_param(
+            "skillbridge_whatsapp_cloud.conversation_summary_mode", "view"
+        )
+        partner_a = self.partners[0]
+        first = self.Log.create(self._vals(partner_a, 1))
+        conversation = first.conversation_id
+        self.assertTrue(conversation)
+        self.assertFalse(conversation.last_message_id)
+
+        latest = self.Log.create(self._vals(partner_a, 2))
+        self.Conversation._cron_sync_inbox()
+        summary = self.env["whatsapp.conversation.summary"].search([("partner_id", "=", partner_a.id)])
+        self.assertEqual(summary.conversation_id, conversation)
+        self.assertEqual(summary.last_message_id, latest)
+        self.assertEqual(summary.last_message, "Message 2")
+        self.assertEqual(
+            self.Conversation._action_open_inbox()["res_model"], "whatsapp.conversation.summary"
+        )
+
+    def test_summary_sync_only_rebuilds_touched_partners(self):
+        self.env["ir.config_parameter"].sudo().set_param(
+            "skillbridge_whatsapp_cloud.conversation_summary_mode", "view"
+        )
+        partner_a, partner_b = self.partners
+        log_a, _log_b = self.Log.create([self._vals(partner_a, 1), self._vals(partner_b, 1)])
+        Summary = self.env["whatsapp.conversation.summary"]
+        Summary._sync_pending()
+
+        log_a.write({"status": "read"})
+        self.env.cr.execute("SELECT partner_id FROM whatsapp_conversation_summary_pending")
+        self.assertEqual([row[0] for row in self.env.cr.fetchall()], [partner_a.id])
+        self.assertEqual(Summary._sync_pending(), 1)
+        summary = Summary.search([("partner_id", "=", partner_a.id)])
+        self.assertEqual(summary.last_status, "read")
+
+    def test_backfill_rebuilds_conversations_from_logs(self):
+        partner_a, partner_b = self.partners
+        logs = self.Log.create([self._vals(partner_a, 1), self._vals(partner_a, 2), self._vals(partner_b, 1)])
+        self.Conversation.search([("partner_id", "in", self.partners.ids)]).unlink()
+        self.Log.invalidate_cache()
+
+        self.Conversation._backfill_from_logs(chunk_size=1)
+
+        conversation_a = self.Conversation.search([("partner_id", "=", partner_a.id)])
+        self.assertEqual(len(conversation_a), 1)
+        self.assertEqual(conversation_a.last_message_id, logs[1])
+        self.assertEqual(conversation_a.last_message, "Message 2")
+        self.assertEqual(logs[0].conversation_id, conversation_a)
+        self.assertTrue(logs[2].conversation_id)
+
+    def test_switching_back_to_stored_resyncs_conversations(self):
+        params = self.env["ir.config_parameter"].sudo()
+        params.set_param("skillbridge_whatsapp_cloud.conversation_summary_mode", "view")
+        partner_a = self.partners[0]
+        log = self.Log.create(self._vals(partner_a, 1))
+        self.assertFalse(log.conversation_id.last_message_id)
+
+        params.set_param("skillbridge_whatsapp_cloud.conversation_summary_mode", "stored")
+        self.Conversation._summary_mode_changed("view")
+        self.Conversation._cron_sync_inbox()
+
+        self.assertEqual(log.conversation_id.last_message_id, log)
+        self.assertEqual(log.conversation_id.last_message, "Message 1")
+        self.assertFalse(params.get_param("skillbridge_whatsapp_cloud.conversation_resync_pending"))
+
+    def test_backfill_summary_matches_live_summary(self):
+        partner_a = self.partners[0]
+        log = self.Log.create(dict(self._vals(partner_a, 1), message_body="", template_name="order_ready"))
+        live_summary = log.conversation_id.last_message
+        self.Conversation.search([("partner_id", "=", partner_a.id)]).unlink()
+        self.Log.invalidate_cache()
+
+        self.Conversation._backfill_from_logs()
+
+        conversation = self.Conversation.search([("partner_id", "=", partner_a.id)])
+        self.assertEqual(conversation.last_message, live_summary)
@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase
+
+from ..tools import graph_client
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = "" if self.ok else "bad request"
+        self.headers = {}
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class TestDocumentPipeline(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        partner = self.env["res.partner"].create({"name": "Pipeline Partner", "mobile": "+15550003333"})
+        self.order = self.env["sale.order"].create(
+            {"partner_id": partner.id, "partner_invoice_id": partner.id, "partner_shipping_id": partner.id}
+        )
+        self.sent_filenames = []
+
+    def _fake_post(self, url, **kwargs):
+        if url.endswith("/media"):
+            return FakeResponse({"id": "media-%s" % kwargs["files"]["file"][0]})
+        filename = kwargs["json"]["document"]["filename"]
+        if filename == "broken.pdf":
+            return FakeResponse({"error": {"message": "bad", "code": 131009}}, status_code=400)
+        self.sent_filenames.append(filename)
+        return FakeResponse({"messages": [{"id": "wamid.%s" % filename}]})
+
+    def _documents(self, *names):
+        return [(lambda name=name: (b"%PDF " + name.encode(), name), "Caption %s" % name) for name in names]
+
+    def test_documents_are_sent_in_order(self):
+        with patch.object(graph_client, "post", side_effect=self._fake_post):
+            sent, error = self.order._send_whatsapp_documents(
+                "+15550003333", "token", "777", self._documents("a.pdf", "b.pdf", "c.pdf")
+            )
+        self.assertFalse(error)
+        self.assertEqual(self.sent_filenames, ["a.pdf", "b.pdf", "c.pdf"])
+        self.assertEqual([caption for _msg, caption in sent], ["Caption a.pdf", "Caption b.pdf", "Caption c.pdf"])
+
+    def test_failure_stops_following_documents(self):
+        with patch.object(graph_client, "post", side_effect=self._fake_post):
+            sent, error = self.order._send_whatsapp_documents(
+                "+15550003333", "token", "777", self._documents("a.pdf", "broken.pdf", "c.pdf")
+            )
+        self.assertIsInstance(error, graph_client.GraphAPIError)
+        self.assertEqual(self.sent_filenames, ["a.pdf"])
+        self.assertEqual(len(sent), 1)
+
+    def test_render_failure_still_sends_previous_documents(self):
+        def broken_render():
+            raise ValueError("render failed")
+
+        documents = self._documents("a.pdf", "b.pdf") + [(broken_render, "Caption c.pdf")]
+        with patch.object(graph_client, "post", side_effect=self._fake_post):
+            sent, error = self.order._send_whatsapp_documents("+15550003333", "token", "777", documents)
+        self.assertIsInstance(error, ValueError)
+        self.assertEqual(self.sent_filenames, ["a.pdf", "b.pdf"])
+        self.assertEqual(len(sent), 2)
@@ -0,0 +1,42 @@
+import base64
+import gzip
+import json
+
+from odoo.tests import TransactionCase
+
+
+class TestLogRetention(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        self.partner = self.env["res.partner"].create({"name": "Retention Partner"})
+        self.Log = self.env["whatsapp.message.log"]
+        self.params = self.env["ir.config_parameter"].sudo()
+
+    def _create_log(self, msg_id, age):
+        log = self.Log.create(
+            {"message_id": msg_id, "partner_id": self.partner.id, "last_payload": json.dumps({"id": msg_id})}
+        )
+        self.env.cr.execute(
+            "UPDATE whatsapp_message_log SET create_date = create_date - %s::interval WHERE id = %s", (age, log.id)
+        )
+        return log
+
+    def test_old_payloads_are_stripped(self):
+        self.params.set_param("skillbridge_whatsapp_cloud.payload_retention_days", 30)
+        old = self._create_log("wamid.old", "40 days")
+        recent = self._create_log("wamid.recent", "1 day")
+        self.Log._cron_apply_retention()
+        self.assertFalse(old.last_payload)
+        self.assertTrue(recent.last_payload)
+
+    def test_old_logs_are_archived(self):
+        self.params.set_param("skillbridge_whatsapp_cloud.log_archive_months", 3)
+        old = self._create_log("wamid.archived", "120 days")
+        recent = self._create_log("wamid.kept", "10 days")
+        self.Log._cron_apply_retention()
+        self.assertFalse(old.exists())
+        self.assertTrue(recent.exists())
+        archive = self.env["whatsapp.message.archive"].search([("last_log_id", "=", old.id)])
+        self.assertEqual(archive.log_count, 1)
+        lines = gzip.decompress(base64.b64decode(archive.attachment_id.datas)).decode().splitlines()
+        self.assertEqual(json.loads(lines[0])["message_id"], "wamid.archived")
@@ -0,0 +1,42 @@
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase
+
+from ..tools import graph_client
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = ""
+        self.headers = {}
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class TestMediaCache(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        partner = self.env["res.partner"].create({"name": "Media Partner", "mobile": "+15550002222"})
+        self.order = self.env["sale.order"].create(
+            {"partner_id": partner.id, "partner_invoice_id": partner.id, "partner_shipping_id": partner.id}
+        )
+        self.urls = []
+
+    def _fake_post(self, url, **kwargs):
+        self.urls.append(url)
+        if url.endswith("/media"):
+            return FakeResponse({"id": "media-%s" % len(self.urls)})
+        return FakeResponse({"messages": [{"id": "wamid.doc%s" % len(self.urls)}]})
+
+    def test_same_document_is_uploaded_once(self):
+        with patch.object(graph_client, "post", side_effect=self._fake_post):
+            for _index in range(2):
+                self.order._send_whatsapp_document("+15550002222", "token", "999", b"%PDF-1.4 same", "SO.pdf")
+            self.order._send_whatsapp_document("+15550002222", "token", "999", b"%PDF-1.4 other", "SO.pdf")
+        uploads = [url for url in self.urls if url.endswith("/media")]
+        self.assertEqual(len(uploads), 2)
+        self.assertEqual(len(self.urls), 5)
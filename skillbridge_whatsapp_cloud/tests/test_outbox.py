@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import TransactionCase
+
+from ..tools import graph_client
+
+
+class TestOutbox(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        self.partner = self.env["res.partner"].create({"name": "Outbox Partner", "mobile": "+15550001111"})
+        self.order = self.env["sale.order"].create(
+            {"partner_id": self.partner.id, "partner_invoice_id": self.partner.id, "partner_shipping_id": self.partner.id}
+        )
+        self.env["ir.config_parameter"].sudo().set_param("skillbridge_whatsapp_cloud.auto_send_on_confirm", "True")
+
+    def test_confirm_enqueues_instead_of_sending(self):
+        self.order.action_confirm()
+        outbox = self.env["whatsapp.outbox"].search([("order_id", "=", self.order.id)])
+        self.assertEqual(len(outbox), 1)
+        self.assertEqual(outbox.state, "pending")
+        self.assertEqual(outbox.trigger, "order_confirm")
+        self.assertFalse(self.env["whatsapp.message.log"].search([("order_id", "=", self.order.id)]))
+
+    def test_permanent_failure_is_not_retried(self):
+        # Partner has not opted in, so the send is refused before any API call; retrying cannot help.
+        self.order.action_confirm()
+        outbox = self.env["whatsapp.outbox"].search([("order_id", "=", self.order.id)])
+        self.env["whatsapp.outbox"]._cron_dispatch()
+        self.assertEqual(outbox.state, "failed")
+        self.assertEqual(outbox.attempts, 1)
+        self.assertTrue(outbox.last_error)
+
+    def test_retry_resumes_after_parts_already_sent(self):
+        outbox = self.env["whatsapp.outbox"]._enqueue(self.order, "order_confirm")
+        order_class = type(self.order)
+        texts = []
+        document_results = [
+            ([], graph_client.GraphAPIError("unavailable", status_code=503)),
+            ([("wamid.pdf", "Sales Order")], None),
+        ]
+
+        def send_text(order, mobile, token, phone_number_id, body):
+            texts.append(body)
+            return "wamid.text"
+
+        with patch.object(order_class, "_get_whatsapp_mobile", lambda order: "+15550001111"), patch.object(
+            order_class, "_get_whatsapp_credentials", lambda order: ("token", "777")
+        ), patch.object(order_class, "_send_whatsapp_text", send_text), patch.object(
+            order_class, "_send_whatsapp_documents", lambda order, *args: document_results.pop(0)
+        ):
+            outbox._dispatch()
+            self.assertEqual(outbox.state, "pending")
+            self.assertEqual(outbox.sent_parts, 1)
+            outbox.next_attempt_at = fields.Datetime.now()
+            outbox._dispatch()
+
+        self.assertEqual(outbox.state, "done")
+        self.assertEqual(len(texts), 1)
+        logs = self.env["whatsapp.message.log"].search([("order_id", "=", self.order.id)])
+        self.assertEqual(sorted(logs.mapped("message_id")), ["wamid.pdf", "wamid.text"])
@@ -0,0 +1,39 @@
+from odoo.tests import TransactionCase
+
+from ..models.res_partner import normalize_whatsapp_number
+
+
+class TestPartnerPhoneLookup(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        self.Partner = self.env["res.partner"]
+        self.partner = self.Partner.create({"name": "Formatted Mobile", "mobile": "+1 (555) 010-2030"})
+
+    def test_normalize_number(self):
+        self.assertEqual(normalize_whatsapp_number(" +1 555-010 2030 "), "+15550102030")
+        self.assertEqual(normalize_whatsapp_number("0044 20 7946 0000"), "+442079460000")
+        self.assertFalse(normalize_whatsapp_number("n/a"))
+
+    def test_lookup_ignores_formatting(self):
+        self.assertEqual(self.partner.whatsapp_mobile_e164, "+15550102030")
+        self.assertEqual(self.Partner._find_by_whatsapp_number("15550102030"), self.partner)
+
+    def test_lookup_follows_phone_changes(self):
+        self.assertEqual(self.Partner._find_by_whatsapp_number("+15550102030"), self.partner)
+        self.partner.write({"mobile": "+15550109999"})
+        self.assertFalse(self.Partner._find_by_whatsapp_number("+15550102030"))
+        self.assertEqual(self.Partner._find_by_whatsapp_number("+15550109999"), self.partner)
+
+    def test_numbers_before_backfill(self):
+        self.env["ir.config_parameter"].sudo().set_param("skillbridge_whatsapp_cloud.partner_e164_backfill_id", 0)
+        self.partner.flush()
+        self.env.cr.execute(
+            "UPDATE res_partner SET whatsapp_mobile_e164 = NULL, whatsapp_phone_e164 = NULL WHERE id = %s",
+            (self.partner.id,),
+        )
+        self.partner.invalidate_cache(["whatsapp_mobile_e164", "whatsapp_phone_e164"])
+        self.assertEqual(self.partner._get_whatsapp_number(), "+15550102030")
+        self.assertEqual(self.Partner._find_by_whatsapp_number("+1 (555) 010-2030"), self.partner)
+
+        self.Partner._cron_backfill_whatsapp_e164()
+        self.assertEqual(self.partner.whatsapp_mobile_e164, "+15550102030")
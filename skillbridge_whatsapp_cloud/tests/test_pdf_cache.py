@@ -0,0 +1,28 @@
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase
+
+
+class TestPdfCache(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        partner = self.env["res.partner"].create({"name": "PDF Partner"})
+        self.order = self.env["sale.order"].create(
+            {"partner_id": partner.id, "partner_invoice_id": partner.id, "partner_shipping_id": partner.id}
+        )
+        self.Report = type(self.env["ir.actions.report"])
+
+    def test_order_pdf_rendered_once_until_modified(self):
+        with patch.object(self.Report, "_render_qweb_pdf", return_value=(b"%PDF-1.4 order", "pdf")) as render:
+            first, _name = self.order._render_sale_order_pdf()
+            second, _name = self.order._render_sale_order_pdf()
+            self.assertEqual(render.call_count, 1)
+            self.assertEqual(first, second)
+
+            # Within one test transaction write() keeps the same write_date; move it like a later edit would.
+            self.env.cr.execute(
+                "UPDATE sale_order SET write_date = write_date + interval '1 minute' WHERE id = %s", (self.order.id,)
+            )
+            self.order.invalidate_cache(["write_date"])
+            self.order._render_sale_order_pdf()
+            self.assertEqual(render.call_count, 2)
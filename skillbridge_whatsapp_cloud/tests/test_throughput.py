@@ -0,0 +1,46 @@
+from odoo.tests import TransactionCase
+
+from ..tools import throughput
+
+
+class TestThroughput(TransactionCase):
+    def test_fair_share_follows_weights(self):
+        shares = throughput.fair_share(100, {1: 1000, 2: 1000}, {1: 30, 2: 10})
+        self.assertEqual(shares, {1: 75, 2: 25})
+
+    def test_fair_share_redistributes_unused_budget(self):
+        shares = throughput.fair_share(100, {1: 10, 2: 1000, 3: 1000}, {1: 10, 2: 10, 3: 10})
+        self.assertEqual(shares[1], 10)
+        self.assertEqual(shares[2] + shares[3], 90)
+        self.assertLessEqual(abs(shares[2] - shares[3]), 1)
+
+    def test_interleave_spreads_campaigns(self):
+        merged = throughput.interleave({"a": ["a1", "a2", "a3", "a4"], "b": ["b1", "b2"]}, {"a": 2, "b": 1})
+        self.assertEqual(merged[:3].count("b1") + merged[:3].count("b2"), 1)
+        self.assertEqual(len(merged), 6)
+
+    def test_adaptive_rate_backs_off_and_recovers(self):
+        pacer = throughput.AdaptiveRate(20)
+        start = pacer.rate
+        for _index in range(50):
+            pacer.on_success(0.1)
+        self.assertGreater(pacer.rate, start)
+        self.assertLessEqual(pacer.rate, 20)
+        healthy = pacer.rate
+        pacer.on_throttle(retry_after=30)
+        self.assertLess(pacer.rate, healthy)
+        self.assertGreater(pacer.pause_remaining(), 25)
+        self.assertFalse(pacer.acquire(max_wait=1))
+
+    def test_circuit_breaker_opens_and_probes(self):
+        breaker = throughput.CircuitBreaker(threshold=2, cooldown=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertTrue(breaker.tripped)
+        # Cooldown elapsed: exactly one probe goes through.
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertFalse(breaker.tripped)
+        self.assertTrue(breaker.allow())
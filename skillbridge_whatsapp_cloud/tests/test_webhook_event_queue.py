@@ -0,0 +1,59 @@
+import json
+
+from odoo.tests import TransactionCase
+
+
+class TestWebhookEventQueue(TransactionCase):
+    def setUp(self):
+        super().setUp()
+        self.partner = self.env["res.partner"].create({"name": "Queued Partner", "mobile": "+15557654321"})
+        self.Event = self.env["whatsapp.webhook.event"]
+
+    def _payload(self, msg_id):
+        return {
+            "entry": [
+                {
+                    "id": "entry1",
+                    "changes": [
+                        {
+                            "value": {
+                                "messages": [
+                                    {
+                                        "id": msg_id,
+                                        "from": "+15557654321",
+                                        "type": "text",
+                                        "text": {"body": "Hi"},
+                                    }
+                                ]
+                            }
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def test_cron_drains_pending_events(self):
+        event = self.Event._enqueue(json.dumps(self._payload("wamid.queued1")))
+        self.assertEqual(event.state, "pending")
+        self.assertFalse(self.env["whatsapp.message.log"].search([("message_id", "=", "wamid.queued1")]))
+
+        self.Event._cron_process_events()
+
+        self.assertEqual(event.state, "done")
+        log = self.env["whatsapp.message.log"].search([("message_id", "=", "wamid.queued1")], limit=1)
+        self.assertTrue(log)
+        self.assertEqual(log.partner_id, self.partner)
+
+    def test_invalid_json_is_marked_failed(self):
+        event = self.Event._enqueue("{not json")
+        self.Event._cron_process_events()
+        self.assertEqual(event.state, "failed")
+        self.assertTrue(event.last_error)
+
+    def test_enqueue_adds_a_single_cron_trigger(self):
+        cron = self.env.ref("skillbridge_whatsapp_cloud.ir_cron_whatsapp_webhook_events")
+        self.env.cr.execute("DELETE FROM ir_cron_trigger WHERE cron_id = %s", (cron.id,))
+        for idx in range(3):
+            self.Event._enqueue(json.dumps(self._payload(f"wamid.storm{idx}")))
+        self.env.cr.execute("SELECT count(*) FROM ir_cron_trigger WHERE cron_id = %s", (cron.id,))
+        self.assertEqual(self.env.cr.fetchone()[0], 1)
@@ -131,7 +131,7 @@ class TestWebhookProcessing(TransactionCase):
 
         log = self.env["whatsapp.message.log"].search([("message_id", "=", "wamid.outbound1")], limit=1)
         self.assertEqual(log.status, "failed")
-        self.assertTrue(log.last_payload)
+        self.assertEqual(log.event_ids.mapped("error_code"), ["470"])
 
         messages = self.order.message_ids.filtered(lambda m: "failed" in (m.body or ""))
         self.assertTrue(messages, "Order should have a chatter message for failed WhatsApp delivery")
@@ -192,3 +192,137 @@ class TestWebhookProcessing(TransactionCase):
 
         self.partner.invalidate_cache()
         self.assertTrue(self.partner.whatsapp_opt_in, "START should opt the partner in")
+
+    def test_status_batch_updates_all_logs(self):
+        Log = self.env["whatsapp.message.log"]
+        for idx in range(3):
+            Log.create(
+                {
+                    "message_id": f"wamid.batch{idx}",
+                    "order_id": self.order.id,
+                    "partner_id": self.partner.id,
+                    "direction": "outbound",
+                    "status": "sent",
+                }
+            )
+        payload = {
+            "entry": [
+                {
+                    "id": "entry1",
+                    "changes": [
+                        {
+                            "value": {
+                                "statuses": [
+                                    {"id": "wamid.batch0", "status": "delivered"},
+                                    {"id": "wamid.batch1", "status": "delivered"},
+                                    {"id": "wamid.batch2", "status": "read"},
+                                    {"id": "wamid.unknown", "status": "read"},
+                                ]
+                            }
+                        }
+                    ],
+                }
+            ]
+        }
+        self.controller._process_status_updates(payload, env=self.env)
+
+        logs = Log.search([("message_id", "like", "wamid.batch")])
+        statuses = {log.message_id: log.status for log in logs}
+        self.assertEqual(statuses, {"wamid.batch0": "delivered", "wamid.batch1": "delivered", "wamid.batch2": "read"})
+        self.assertEqual(len(logs.event_ids), 3)
+
+    def test_redelivered_message_is_ignored(self):
+        payload = {
+            "entry": [
+                {
+                    "id": "entry1",
+                    "changes": [
+                        {
+                            "value": {
+                                "messages": [
+                                    {
+                                        "id": "wamid.retry1",
+                                        "from": "+15551234567",
+                                        "type": "text",
+                                        "text": {"body": "Hello again"},
+                                    }
+                                ]
+                            }
+                        }
+                    ],
+                }
+            ]
+        }
+        self.controller._process_messages(payload, env=self.env)
+        self.controller._process_messages(payload, env=self.env)
+
+        logs = self.env["whatsapp.message.log"].search([("message_id", "=", "wamid.retry1")])
+        self.assertEqual(len(logs), 1, "A webhook retry must not create a second inbound log")
+
+    def test_status_never_regresses(self):
+        log = self.env["whatsapp.message.log"].create(
+            {
+                "message_id": "wamid.ordered1",
+                "partner_id": self.partner.id,
+                "direction": "outbound",
+                "status": "sent",
+            }
+        )
+
+        def status_payload(status):
+            return {"entry": [{"id": "entry1", "changes": [{"value": {"statuses": [{"id": "wamid.ordered1", "status": status}]}}]}]}
+
+        self.controller._process_status_updates(status_payload("read"), env=self.env)
+        self.assertEqual(log.status, "read")
+        self.controller._process_status_updates(status_payload("delivered"), env=self.env)
+        self.assertEqual(log.status, "read", "A late delivered callback must not overwrite read")
+
+    def test_status_events_keep_full_timeline(self):
+        log = self.env["whatsapp.message.log"].create(
+            {
+                "message_id": "wamid.timeline1",
+                "partner_id": self.partner.id,
+                "direction": "outbound",
+                "status": "sent",
+            }
+        )
+        statuses = [
+            {"id": "wamid.timeline1", "status": "sent", "timestamp": "1700000000"},
+            {"id": "wamid.timeline1", "status": "read", "timestamp": "1700000060"},
+            {"id": "wamid.timeline1", "status": "delivered", "timestamp": "1700000030", "pricing": {"billable": True}},
+        ]
+        payload = {"entry": [{"id": "entry1", "changes": [{"value": {"statuses": statuses}}]}]}
+        self.controller._process_status_updates(payload, env=self.env)
+
+        self.assertEqual(log.status, "read")
+        self.assertEqual(log.event_ids.mapped("status"), ["sent", "delivered", "read"])
+        delivered = log.event_ids.filtered(lambda event: event.status == "delivered")
+        self.assertEqual(json.loads(delivered.payload), {"pricing": {"billable": True}})
+        self.assertFalse(log.last_payload, "Status callbacks no longer overwrite the log payload")
+
+    def test_status_batch_query_count_is_flat(self):
+        Log = self.env["whatsapp.message.log"]
+
+        def run_batch(prefix, size):
+            Log.create(
+                [
+                    {"message_id": f"wamid.{prefix}{idx}", "partner_id": self.partner.id, "status": "sent"}
+                    for idx in range(size)
+                ]
+            )
+            statuses = [{"id": f"wamid.{prefix}{idx}", "status": "delivered"} for idx in range(size)]
+            return {"entry": [{"id": "entry1", "changes": [{"value": {"statuses": statuses}}]}]}
+
+        # Warm the caches (config parameters, registry lookups) before counting.
+        self.controller._process_status_updates(run_batch("warm", 1), env=self.env)
+
+        small = run_batch("small", 2)
+        self.env["base"].flush()
+        count0 = self.cr.sql_log_count
+        self.controller._process_status_updates(small, env=self.env)
+        self.env["base"].flush()
+        small_count = self.cr.sql_log_count - count0
+
+        large = run_batch("large", 20)
+        with self.assertQueryCount(small_count):
+            self.controller._process_status_updates(large, env=self.env)
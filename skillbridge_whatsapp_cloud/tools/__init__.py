@@ -0,0 +1 @@
+from . import graph_client as graph_client
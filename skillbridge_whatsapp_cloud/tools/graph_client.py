@@ -0,0 +1,192 @@
+"""Shared HTTP access to the WhatsApp Cloud (Graph) API.
+
+Every caller goes through one pooled keep-alive ``requests.Session`` per worker
+process, so consecutive sends reuse TLS connections instead of opening one per call.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+GRAPH_API_VERSION = "v20.0"
+GRAPH_API_URL = f"https://graph.facebook.com/{GRAPH_API_VERSION}"
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 32
+# (connect, read) timeouts in seconds, keyed by the last path segment of the endpoint.
+ENDPOINT_TIMEOUTS = {
+    "messages": (5, 15),
+    "media": (5, 30),
+    "message_templates": (5, 20),
+}
+DEFAULT_TIMEOUT = (5, 15)
+# Senders whose client is kept per process; older ones (and their tokens) are dropped first.
+MAX_CLIENTS = 32
+# Graph error codes reporting that the sending number or app exceeded a rate limit.
+THROTTLE_ERROR_CODES = {4, 80007, 130429, 131048}
+# Too many messages to the same recipient: only that recipient must wait.
+PAIR_RATE_LIMIT_CODES = {131056}
+# Temporary errors and service unavailability on Meta's side; anything else in 4xx will not heal by retrying.
+TRANSIENT_ERROR_CODES = {1, 2, 131000, 131016, 133004}
+# Errors returned when a media id can no longer be used (invalid parameter, media download/upload error).
+MEDIA_ERROR_CODES = {100, 131052, 131053}
+
+# Error classes driving the retry policies of the callers.
+TRANSIENT = "transient"
+THROTTLED = "throttled"
+PERMANENT = "permanent"
+
+
+class GraphAPIError(Exception):
+    """A failed Graph call, with what a retry policy needs to decide on it."""
+
+    def __init__(self, message, status_code=None, code=None, retry_after=None, kind=TRANSIENT):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.code = code
+        self.retry_after = retry_after
+        self.kind = kind
+
+
+class GraphClient:
+    """Graph endpoints and headers bound to one sender (access token and phone number id)."""
+
+    def __init__(self, token, phone_number_id):
+        self.token = token
+        self.phone_number_id = phone_number_id
+        self.messages_url = graph_url(phone_number_id, "messages")
+        self.media_url = graph_url(phone_number_id, "media")
+        self.auth_headers = {"Authorization": f"Bearer {token}"}
+        self.json_headers = dict(self.auth_headers, **{"Content-Type": "application/json"})
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_clients = OrderedDict()
+_clients_lock = threading.Lock()
+
+
+def get_session():
+    """Return the pooled session of this process (re-created after a fork)."""
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                session = requests.Session()
+                session.mount(
+                    "https://", HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                )
+                _session, _session_pid = session, pid
+    return _session
+
+
+def get_client(token, phone_number_id):
+    """Return the client of this process for the sender, built once and reused (LRU of MAX_CLIENTS)."""
+    key = (token, phone_number_id)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = GraphClient(token, phone_number_id)
+            while len(_clients) > MAX_CLIENTS:
+                _clients.popitem(last=False)
+        else:
+            _clients.move_to_end(key)
+    return client
+
+
+def clear_clients():
+    """Forget every cached client, e.g. after tokens were rotated."""
+    with _clients_lock:
+        _clients.clear()
+
+
+def graph_url(*parts):
+    return "/".join([GRAPH_API_URL] + [str(part).strip("/") for part in parts])
+
+
+def endpoint_timeout(url):
+    endpoint = url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+    return ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+
+
+def request(method, url, **kwargs):
+    kwargs.setdefault("timeout", endpoint_timeout(url))
+    return get_session().request(method, url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def error_code(response):
+    """Graph ``error.code`` of a failed response, or None."""
+    try:
+        payload = response.json()
+    except ValueError:
+        return None
+    error = payload.get("error") if isinstance(payload, dict) else None
+    return error.get("code") if isinstance(error, dict) else None
+
+
+def retry_after(response):
+    """Seconds to wait according to the Retry-After header (delta or HTTP date), or None."""
+    value = (response.headers or {}).get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_response(response):
+    """Error class (TRANSIENT, THROTTLED or PERMANENT) of a failed response."""
+    code = error_code(response)
+    if response.status_code == 429 or code in THROTTLE_ERROR_CODES or code in PAIR_RATE_LIMIT_CODES:
+        return THROTTLED
+    if response.status_code >= 500 or response.status_code == 408 or code in TRANSIENT_ERROR_CODES:
+        return TRANSIENT
+    return PERMANENT
+
+
+def classify_exception(exc):
+    """Error class of an exception raised while calling the API or preparing the call."""
+    if isinstance(exc, GraphAPIError):
+        return exc.kind
+    if isinstance(exc, requests.RequestException):
+        return TRANSIENT
+    return PERMANENT
+
+
+def error_from_response(response):
+    try:
+        detail = response.json()
+        message = detail.get("error", {}).get("message") or response.text
+    except (ValueError, AttributeError):
+        message = response.text
+    return GraphAPIError(
+        message,
+        status_code=response.status_code,
+        code=error_code(response),
+        retry_after=retry_after(response),
+        kind=classify_response(response),
+    )
+
+
+def url_node(url):
+    """Graph node addressed by ``url`` (the phone number id for messages and media)."""
+    return url[len(GRAPH_API_URL):].strip("/").split("/", 1)[0]
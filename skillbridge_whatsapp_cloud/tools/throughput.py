@@ -0,0 +1,243 @@
+"""Rate limiting, circuit breaking and fair-share helpers used to dispatch Graph API calls."""
+import threading
+import time
+from collections import deque
+
+MIN_RATE = 0.5
+# Additive step: roughly +1 msg/s for every ``rate`` healthy replies.
+RATE_INCREASE = 1.0
+THROTTLE_DECREASE = 0.5
+LATENCY_DECREASE = 0.8
+# Latency (EWMA, seconds) above LATENCY_FACTOR x the best observed and SLOW_LATENCY counts as congestion.
+LATENCY_FACTOR = 2.0
+SLOW_LATENCY = 1.0
+DECREASE_COOLDOWN = 1.0
+# Longer Retry-After pauses defer the remaining sends to a later run instead of blocking the worker.
+MAX_PAUSE_WAIT = 5.0
+
+# Consecutive transient failures that open a circuit, and how long it then stays open (doubling up to the max).
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+BREAKER_MAX_COOLDOWN = 600.0
+
+_pacers = {}
+_pacers_lock = threading.Lock()
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Thread-safe token bucket pacing sends to ``rate`` messages per second."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = max(float(rate), 0.1)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill()
+            self.rate = max(float(rate), 0.1)
+            self.capacity = max(1.0, self.rate)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until one token is available and consume it."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveRate:
+    """AIMD send rate of one phone number, capped by ``ceiling`` messages per second.
+
+    The rate grows additively while the API answers quickly and successfully, and is
+    cut multiplicatively on throttling or when latency climbs well above the best
+    observed. A Retry-After from the API pauses sending outright until it expires.
+    """
+
+    def __init__(self, ceiling):
+        self.ceiling = max(float(ceiling), MIN_RATE)
+        self.rate = max(self.ceiling / 2, MIN_RATE)
+        self.latency = None
+        self.baseline = None
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._bucket = TokenBucket(self.rate)
+        self._lock = threading.Lock()
+
+    def set_ceiling(self, ceiling):
+        with self._lock:
+            self.ceiling = max(float(ceiling), MIN_RATE)
+            self._set_rate(self.rate)
+
+    def _set_rate(self, rate):
+        self.rate = min(max(rate, MIN_RATE), self.ceiling)
+        self._bucket.set_rate(self.rate)
+
+    def _decrease(self, factor):
+        # Concurrent sends report the same congestion; cut once per cooldown, not once per reply.
+        now = time.monotonic()
+        if now - self._last_decrease >= DECREASE_COOLDOWN:
+            self._last_decrease = now
+            self._set_rate(self.rate * factor)
+
+    def pause_remaining(self):
+        return max(0.0, self.paused_until - time.time())
+
+    def acquire(self, max_wait=MAX_PAUSE_WAIT):
+        """Wait for a send slot; False when a Retry-After pause lasts longer than ``max_wait`` seconds."""
+        pause = self.pause_remaining()
+        if pause > max_wait:
+            return False
+        if pause:
+            time.sleep(pause)
+        self._bucket.acquire()
+        return True
+
+    def on_success(self, latency):
+        with self._lock:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            # Let the baseline drift up slowly so a lasting change of network path becomes the new normal.
+            self.baseline = self.latency if self.baseline is None else min(self.latency, self.baseline * 1.001)
+            if self.latency > max(self.baseline * LATENCY_FACTOR, SLOW_LATENCY):
+                self._decrease(LATENCY_DECREASE)
+            else:
+                self._set_rate(self.rate + RATE_INCREASE / self.rate)
+
+    def on_throttle(self, retry_after=None):
+        with self._lock:
+            self._decrease(THROTTLE_DECREASE)
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.time() + retry_after)
+
+
+def get_pacer(key, ceiling):
+    """Return the adaptive pacer of this process for ``key`` (a phone number id), capped at ``ceiling``."""
+    with _pacers_lock:
+        pacer = _pacers.get(key)
+        if pacer is None:
+            pacer = _pacers[key] = AdaptiveRate(ceiling)
+    if pacer.ceiling != max(float(ceiling), MIN_RATE):
+        pacer.set_ceiling(ceiling)
+    return pacer
+
+
+class CircuitBreaker:
+    """Fail fast while the Graph API keeps failing for a phone number.
+
+    After ``threshold`` consecutive transient failures the circuit opens and calls are
+    refused for ``cooldown`` seconds. Then a single probe call is let through: its
+    success closes the circuit, its failure re-opens it with a doubled cooldown.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.base_cooldown = self.cooldown = cooldown
+        self.failures = 0
+        self.opened_until = 0.0
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def tripped(self):
+        return self.failures >= self.threshold
+
+    def retry_in(self):
+        """Seconds until calls may be attempted again (0 while closed)."""
+        if not self.tripped:
+            return 0.0
+        return max(self.opened_until - time.time(), 0.0) if not self.probing else self.cooldown
+
+    def is_open(self):
+        return self.tripped and (self.probing or time.time() < self.opened_until)
+
+    def allow(self):
+        with self._lock:
+            if not self.tripped:
+                return True
+            if self.probing or time.time() < self.opened_until:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.probing = False
+            self.cooldown = self.base_cooldown
+
+    def record_failure(self):
+        with self._lock:
+            if self.probing:
+                self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+                self.probing = False
+            self.failures += 1
+            if self.tripped:
+                self.opened_until = time.time() + self.cooldown
+
+
+def get_breaker(key):
+    """Return the circuit breaker of this process for ``key`` (a phone number id)."""
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker()
+    return breaker
+
+
+def fair_share(budget, demands, weights):
+    """Split ``budget`` between keys in proportion to their weights.
+
+    A key never receives more than its demand; what it leaves unused is shared again
+    between the others (water-filling), so the whole budget is used whenever possible.
+    """
+    shares = dict.fromkeys(demands, 0)
+    active = [key for key in demands if demands[key] > 0 and weights.get(key, 0) > 0]
+    remaining = budget
+    while remaining > 0 and active:
+        active.sort(key=lambda key: weights[key], reverse=True)
+        total_weight = sum(weights[key] for key in active)
+        granted = 0
+        for key in active:
+            quota = max(1, remaining * weights[key] // total_weight)
+            quota = min(quota, demands[key] - shares[key], remaining - granted)
+            shares[key] += quota
+            granted += quota
+            if granted >= remaining:
+                break
+        if not granted:
+            break
+        remaining -= granted
+        active = [key for key in active if shares[key] < demands[key]]
+    return shares
+
+
+def interleave(items_by_key, weights):
+    """Merge per-key lists with smooth weighted round-robin so no key sends in one long burst."""
+    queues = {key: deque(items) for key, items in items_by_key.items() if items}
+    current = dict.fromkeys(queues, 0)
+    merged = []
+    while queues:
+        total_weight = sum(weights[key] for key in queues)
+        for key in queues:
+            current[key] += weights[key]
+        best = max(queues, key=lambda key: current[key])
+        current[best] -= total_weight
+        merged.append(queues[best].popleft())
+        if not queues[best]:
+            del queues[best]
+            del current[best]
+    return merged